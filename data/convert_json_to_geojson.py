@@ -19,63 +19,215 @@ $ python convert_json_to_geojson.py incidents.json out.geojson
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, List
 
+try:
+    import orjson
+except ImportError:  # optional – falls back to the stdlib json module
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional – typed Structs instead of per-Feature dicts
+    msgspec = None
+
 SEP = "."
 
+# Inputs with fewer items than this are converted in-process: shipping
+# items to worker processes costs more than it saves on small files.
+PARALLEL_MIN_ITEMS = 5_000
+CHUNKSIZE = 256
+
+
+if msgspec:
+    # Slot-based GeoJSON types: cheaper to build than dicts and encoded by
+    # msgspec without per-object dict introspection.  The tag is emitted as
+    # the leading "type" member, exactly like the dict form.
+    class Point(msgspec.Struct, tag="Point", tag_field="type"):
+        coordinates: List[float]
+
+    class Feature(msgspec.Struct, tag="Feature", tag_field="type"):
+        geometry: Point
+        properties: Dict[str, Any]
+
+    class FeatureCollection(msgspec.Struct, tag="FeatureCollection", tag_field="type"):
+        features: List[Feature]
+
+
+# orjson reads integers wider than 64 bits as floats; any 19+ digit run
+# sends the file to the stdlib parser instead
+_ALL_ZERO = bytes.maketrans(b"123456789", b"0" * 9)
+
+
+def load_json(path: str) -> Any:
+    """Parse a JSON file, using orjson's C parser when available.
+
+    Files orjson would reject (``NaN``/``Infinity`` literals) or read
+    lossily (very long integers) go through the stdlib parser.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if orjson and raw.translate(_ALL_ZERO).find(b"0" * 19) == -1:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+def _plain(obj: Any) -> bool:
+    """True if msgspec/orjson indent *obj* byte for byte like ``json.dumps``.
+
+    The same check as ``geonext._json._plain`` (this script runs without
+    the package on its path), extended to the msgspec Structs above.
+    """
+    stack, seen = [obj], set()
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is str or t is bool or o is None:
+            continue
+        if t is int:
+            if not -2**63 <= o < 2**64:
+                return False
+        elif t is float:
+            # repr switches to an exponent outside [1e-4, 1e16); NaN/inf fail
+            if not (o == 0 or 1e-4 <= abs(o) < 1e16):
+                return False
+        elif t is dict or t is list or t is tuple:
+            if id(o) in seen:          # shared or circular: let json decide
+                return False
+            seen.add(id(o))
+            if t is dict:
+                if not all(type(k) is str for k in o):
+                    return False
+                stack.extend(o.values())
+            else:
+                stack.extend(o)
+        elif msgspec and isinstance(o, msgspec.Struct):
+            stack.extend(getattr(o, f) for f in o.__struct_fields__)
+        else:
+            return False
+    return True
+
+
+def dump_json(obj: Any, path: str) -> None:
+    """Write *obj* as 2-space indented UTF-8 JSON, exactly as ``json.dumps``.
+
+    The fast encoders are only used when ``_plain`` says their output is
+    the same; NaN/Infinity, exponent-form floats and the like are written
+    by the stdlib (msgspec Structs converted with ``to_builtins``).
+    """
+    data = None
+    if msgspec and _plain(obj):
+        try:
+            data = msgspec.json.format(msgspec.json.encode(obj), indent=2)
+        except (msgspec.EncodeError, UnicodeEncodeError):
+            pass  # e.g. lone surrogates
+    elif orjson and not msgspec and _plain(obj):
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass  # e.g. lone surrogates
+    if data is None:
+        data = json.dumps(
+            obj, ensure_ascii=False, indent=2,
+            default=msgspec.to_builtins if msgspec else None,
+        ).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+
 
 def flatten(obj: Any, parent_key: str = "", sep: str = SEP) -> Dict[str, Any]:
-    """Recursively flattens nested dicts/lists into a single‑level dict.
+    """Flattens nested dicts/lists into a single‑level dict.
 
     Lists are enumerated with numeric indices so that each element becomes a
     separate key, e.g. ``tags.0``, ``tags.1``.  The default separator is ``.``.
+
+    The walk uses an explicit stack rather than recursion, so deeply nested
+    items neither hit the recursion limit nor allocate an intermediate dict
+    per level; every leaf is written straight into the single output dict.
     """
     items: Dict[str, Any] = {}
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            items.update(flatten(v, new_key, sep=sep))
-    elif isinstance(obj, list):
-        for idx, v in enumerate(obj):
-            new_key = f"{parent_key}{sep}{idx}" if parent_key else str(idx)
-            items.update(flatten(v, new_key, sep=sep))
-    else:
-        # Primitive value
-        items[parent_key] = obj
+    stack = [(parent_key, obj)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        key, value = pop()
+        if isinstance(value, dict):
+            children = value.items()
+        elif isinstance(value, list):
+            children = enumerate(value)
+        else:
+            # Primitive value
+            items[key] = value
+            continue
+        # Push in reverse so keys come out in document order
+        for k, v in reversed(list(children)):
+            push((f"{key}{sep}{k}" if key else str(k), v))
     return items
 
 
-def build_features(data: List[dict]) -> List[dict]:
-    """Return a list of GeoJSON Feature dicts from the input data list."""
-    features: List[dict] = []
-    for item in data:
-        # Copy so we can pop without mutating original
-        parent = dict(item)
-        geo = parent.pop("geolocation", {})
-        base_props = flatten(parent)
-
-        for loc in geo.get("locations", []):
-            # Build merged properties
-            loc_props = flatten(loc)
-            properties = {**base_props, **loc_props}
-
-            # Geometry: lon, lat order per GeoJSON spec
-            try:
-                lon = float(loc["longitude"])
-                lat = float(loc["latitude"])
-            except (KeyError, ValueError, TypeError):
-                # Skip malformed coordinates
-                continue
-
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [lon, lat],
-                },
-                "properties": properties,
-            }
-            features.append(feature)
+def point_feature(lon: float, lat: float, properties: Dict[str, Any]) -> Any:
+    """Return a GeoJSON Point Feature (lon, lat order per GeoJSON spec).
+
+    This is a :class:`Feature` Struct when msgspec is installed and a plain
+    dict otherwise; both serialise to the same JSON.
+    """
+    if msgspec:
+        return Feature(Point([lon, lat]), properties)
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [lon, lat],
+        },
+        "properties": properties,
+    }
+
+
+def features_from_item(item: dict) -> List[Any]:
+    """Return the GeoJSON Features for every location of one input item."""
+    # Copy so we can pop without mutating original
+    parent = dict(item)
+    geo = parent.pop("geolocation", {})
+    locations = geo.get("locations", [])
+    if not locations:
+        return []
+    # Flattened once per item, then copied into every location
+    base_props = flatten(parent)
+
+    features: List[Any] = []
+    for loc in locations:
+        try:
+            lon = float(loc["longitude"])
+            lat = float(loc["latitude"])
+        except (KeyError, ValueError, TypeError):
+            # Skip malformed coordinates before doing any other work
+            continue
+
+        # Build merged properties
+        properties = base_props.copy()
+        properties.update(flatten(loc))
+        features.append(point_feature(lon, lat, properties))
+    return features
+
+
+def build_features(data: List[dict], workers: int = 1) -> List[Any]:
+    """Return a list of GeoJSON Features (see :func:`point_feature`).
+
+    Items are independent, so with ``workers > 1`` they are spread over a
+    process pool; output order is the same as for the serial path.
+    """
+    features: List[Any] = []
+    if workers <= 1:
+        for item in data:
+            features.extend(features_from_item(item))
+        return features
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for feats in ex.map(features_from_item, data, chunksize=CHUNKSIZE):
+            features.extend(feats)
     return features
 
 
@@ -96,22 +248,24 @@ def main(argv: List[str]) -> None:
         out_path = f"{base}.geojson"
 
     # Load input
-    with open(in_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_json(in_path)
 
     if not isinstance(data, list):
         print("Error: root JSON element must be a list of objects", file=sys.stderr)
         sys.exit(1)
 
-    features = build_features(data)
-    feature_collection = {
-        "type": "FeatureCollection",
-        "features": features,
-    }
+    workers = (os.cpu_count() or 1) if len(data) >= PARALLEL_MIN_ITEMS else 1
+    features = build_features(data, workers=workers)
+    if msgspec:
+        feature_collection = FeatureCollection(features)
+    else:
+        feature_collection = {
+            "type": "FeatureCollection",
+            "features": features,
+        }
 
     # Write output
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(feature_collection, f, ensure_ascii=False, indent=2)
+    dump_json(feature_collection, out_path)
 
     print(f"Wrote {len(features)} features to '{out_path}'")
 
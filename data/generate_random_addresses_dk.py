@@ -5,20 +5,30 @@ sample_polygon_addresses.py
 Uniformly sample Danish city addresses that fall **inside a user-defined polygon**
 and save them as GeoJSON in WGS-84 / EPSG 4326.
 
-• Requires Python ≥3.8 and the packages: requests, geojson
-    $ pip install requests geojson
+• Requires Python ≥3.8 and the package: requests  (orjson optional)
+    $ pip install requests
 """
 
 import argparse
 import gzip
+import io
+import itertools
 import json
+import math
 import os
 import random
 import sys
 import urllib.parse
 
 import requests
-import geojson
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:      # optional – stdlib json is the fallback
+    orjson = None
+
+loads = orjson.loads if orjson else json.loads
 
 
 # ----------------------------------------------------------------------
@@ -66,42 +76,96 @@ polygon_param = urllib.parse.quote(
 )
 API_URL = f"{API_BASE}&polygon={polygon_param}"
 
+READ_BUFFER = 1 << 20      # bytes
+
 HEADERS = {
     "Accept-Encoding": "gzip",
     "User-Agent": "dk-addr-sampler/1.1 (polygon)"
 }
 
+# One pooled session, so repeated calls (e.g. several polygons) reuse the
+# TCP + TLS connection instead of handshaking again
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=3),
+)
+
 
 # ----------------------------------------------------------------------
 # 3.  Reservoir sampling from the polygon-filtered stream
+def _uniform() -> float:
+    """Uniform draw from the open interval (0, 1)."""
+    u = random.random()
+    while u == 0.0:
+        u = random.random()
+    return u
+
+
+def _skip_lines(buf: io.BufferedReader, n: int) -> bool:
+    """Advance *buf* past *n* lines without creating an object per line.
+
+    Newlines are counted in whole buffer-fulls via ``peek``; returns False
+    if the stream ends first.
+    """
+    while n:
+        chunk = buf.peek()
+        if not chunk:
+            return False
+        count = chunk.count(b"\n")
+        if count < n:
+            n -= count
+            buf.read(len(chunk))
+            continue
+        pos = -1
+        for _ in range(n):
+            pos = chunk.index(b"\n", pos + 1)
+        buf.read(pos + 1)
+        n = 0
+    return True
+
+
 def reservoir_sample(url: str, k: int, seed: int | None = None) -> list[dict]:
+    """Uniformly sample *k* records with Vitter's Algorithm L.
+
+    Instead of drawing a random number for every record, Algorithm L draws
+    the length of the gap to the next record that enters the reservoir and
+    skips the records in between without splitting or parsing them.
+    """
     if seed is not None:
         random.seed(seed)
 
-    sample: list[dict] = []
-
-    with requests.get(url, stream=True, headers=HEADERS, timeout=120) as resp:
+    with SESSION.get(url, stream=True, headers=HEADERS, timeout=120) as resp:
         resp.raise_for_status()
-        stream = gzip.GzipFile(fileobj=resp.raw)      # DAWA gzips NDJSON
-
-        for i, line in enumerate(stream):
-            rec = json.loads(line)
-            if i < k:
-                sample.append(rec)
-            else:
-                j = random.randint(0, i)
-                if j < k:
-                    sample[j] = rec
-
-    # If the polygon contains fewer than k addresses, just return what we got
+        # DAWA gzips NDJSON; read it through a 1 MiB buffer so readline
+        # works on large decompressed chunks
+        stream = io.BufferedReader(gzip.GzipFile(fileobj=resp.raw),
+                                   buffer_size=READ_BUFFER)
+
+        sample: list[dict] = [loads(line) for line in itertools.islice(stream, k)]
+        if len(sample) < k or k <= 0:
+            # The polygon contains fewer than k addresses: keep them all
+            return sample
+
+        w = math.exp(math.log(_uniform()) / k)
+        while True:
+            skip = math.floor(math.log(_uniform()) / math.log1p(-w))
+            if not _skip_lines(stream, skip):
+                break
+            line = stream.readline()
+            if not line:
+                break
+            sample[random.randrange(k)] = loads(line)
+            w *= math.exp(math.log(_uniform()) / k)
+
     return sample
 
 
 # ----------------------------------------------------------------------
 # 4.  Convert to GeoJSON
-def to_feature(addr: dict) -> geojson.Feature:
+def to_feature(addr: dict) -> dict:
+    """Plain-dict GeoJSON Point Feature for one DAWA address."""
     lon, lat = addr["x"], addr["y"]
-    print(lon, lat)
     props = {
         "id": addr["id"],
         "vejnavn": addr.get("vejnavn"),
@@ -112,7 +176,11 @@ def to_feature(addr: dict) -> geojson.Feature:
         "lat": lat,
         "lon": lon
     }
-    return geojson.Feature(geometry=geojson.Point((lon, lat)), properties=props)
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": props,
+    }
 
 # ----------------------------------------------------------------------
 # 5.  CLI wrapper
@@ -141,10 +209,14 @@ def main() -> None:
 
     # ----------------------------------------------------------- to GeoJSON
     features = [to_feature(a) for a in sample]
-    fc = geojson.FeatureCollection(features)
-
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(fc, f, ensure_ascii=False)
+    fc = {"type": "FeatureCollection", "features": features}
+
+    if orjson:
+        data = orjson.dumps(fc)
+    else:
+        data = json.dumps(fc, ensure_ascii=False).encode("utf-8")
+    with open(args.output, "wb") as f:
+        f.write(data)
 
     print(
         f"✓ Wrote {args.output}  ({os.path.getsize(args.output):,} bytes)",
@@ -2,12 +2,19 @@ import json
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def count_unique_links(json_path):
-    with open(json_path, "r", encoding="utf-8") as f:
-        all_links = json.load(f)
+    raw = Path(json_path).read_bytes()
+    all_links = orjson.loads(raw) if orjson else json.loads(raw)
 
-    # Flatten and deduplicate
-    flat_links = {link for group in all_links for link in group}
+    # Flatten and deduplicate (set.update runs the inner loop in C)
+    flat_links = set()
+    for group in all_links:
+        flat_links.update(group)
     return len(flat_links), flat_links
 
 def main():
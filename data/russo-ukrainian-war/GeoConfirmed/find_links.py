@@ -3,10 +3,22 @@ import re
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import re2 as _re    # linear-time DFA matcher, if installed
+except ImportError:
+    _re = re
+
+# Simple regex for most standard URLs, compiled once
+URL_RE = _re.compile(r'https?://[^\s)]+')
+
 def extract_links(text):
-    # Simple regex for most standard URLs
-    url_pattern = r'https?://[^\s)]+'
-    return re.findall(url_pattern, text)
+    """Lazily yield every URL in *text*, in order of appearance."""
+    return (m.group(0) for m in URL_RE.finditer(text))
 
 def find_links_in_geojson(geojson_data):
     features = geojson_data.get("features", [])
@@ -14,9 +26,9 @@ def find_links_in_geojson(geojson_data):
 
     for feature in features:
         description = feature.get("properties", {}).get("description", "")
-        links = extract_links(description)
-        unique_links = sorted(set(links))
-        all_links.append(unique_links)
+        # order-preserving dedupe straight from the match iterator (no sort,
+        # no intermediate list); counter.py dedupes across features
+        all_links.append(list(dict.fromkeys(extract_links(description))))
 
     return all_links
 
@@ -28,13 +40,15 @@ def main():
     input_path = Path(sys.argv[1])
     output_path = Path(sys.argv[2])
 
-    with input_path.open("r", encoding="utf-8") as f:
-        geojson_data = json.load(f)
+    raw = input_path.read_bytes()
+    geojson_data = orjson.loads(raw) if orjson else json.loads(raw)
 
     links_data = find_links_in_geojson(geojson_data)
 
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(links_data, f, indent=2)
+    if orjson:
+        output_path.write_bytes(orjson.dumps(links_data, option=orjson.OPT_INDENT_2))
+    else:
+        output_path.write_text(json.dumps(links_data, indent=2), encoding="utf-8")
 
     print(f"Extracted links saved to {output_path}")
 
@@ -7,11 +7,28 @@ Usage:
     python kml_points_to_geojson_stream.py  input.kml  output.geojson
 """
 from __future__ import annotations
-import json, sys, os, codecs, xml.etree.ElementTree as ET
+import json, sys, os, codecs, mmap
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterator, List, Dict
+
+try:                         # C parser with tag filtering, if available
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+try:
+    import orjson
+except ImportError:          # optional – stdlib json is the fallback
+    orjson = None
 
 NS = {"kml": "http://www.opengis.net/kml/2.2"}
+PLACEMARK = f"{{{NS['kml']}}}Placemark"
+POINT_PATH = ".//kml:Point"
+COORD_PATH = ".//kml:Point/kml:coordinates"
+DESC_PATH = "kml:description"
+WHEN_PATH = ".//kml:TimeStamp/kml:when"
 
 def sniff_encoding(fp: Path) -> str:
     """
@@ -27,27 +44,60 @@ def sniff_encoding(fp: Path) -> str:
         return "utf-8-sig"
     return "utf-8"
 
+def parse_lon_lat(text: str) -> tuple[float, float]:
+    """
+    Parse a KML ``lon,lat[,alt]`` tuple; the altitude is never converted.
+    """
+    lon, lat = text.split(",", 2)[:2]
+    return float(lon), float(lat)
+
+def iter_placemarks(source) -> Iterator:
+    """
+    Yield every finished <Placemark> element, freeing it once the caller
+    moves on.  With lxml only Placemark end-events are materialised at all.
+    """
+    if HAVE_LXML:
+        for _, elem in ET.iterparse(source, events=("end",), tag=PLACEMARK,
+                                    huge_tree=True):
+            yield elem
+            elem.clear()
+            # drop the already-processed siblings still held by the parent
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    else:
+        for _, elem in ET.iterparse(source, events=("end",)):
+            if elem.tag != PLACEMARK:
+                continue
+            yield elem
+            elem.clear()      # free memory
+
 def convert(kml_path: str, geojson_path: str) -> None:
     enc = sniff_encoding(Path(kml_path))
     features: List[Dict] = []
-    opened = open(kml_path, "r", encoding=enc, errors="replace")
+    if os.path.getsize(kml_path) == 0:
+        sys.exit(f"{kml_path} is empty")
+
+    # Map the file read-only and hand the raw bytes to the parser, which
+    # decodes them itself: pages are faulted in on demand, no str copy made.
+    fd = os.open(kml_path, os.O_RDONLY)
+    mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    if enc == "utf-8-sig":
+        mm.seek(len(codecs.BOM_UTF8))
 
     try:
         # We only care about the *end* event on Placemark,
         # which keeps memory consumption tiny.
-        for event, elem in ET.iterparse(opened, events=("end",)):
-            if not elem.tag.endswith("Placemark"):
+        for elem in iter_placemarks(mm):
+            if elem.find(POINT_PATH, NS) is None:
                 continue
-            if elem.find(".//kml:Point", NS) is None:
-                elem.clear(); continue
 
-            coord_el = elem.find(".//kml:Point/kml:coordinates", NS)
+            coord_el = elem.find(COORD_PATH, NS)
             if coord_el is None or not coord_el.text:
-                elem.clear(); continue
+                continue
 
-            lon, lat, *_ = map(float, coord_el.text.strip().split(","))
-            desc_el = elem.find("kml:description", NS)
-            when_el = elem.find(".//kml:TimeStamp/kml:when", NS)
+            lon, lat = parse_lon_lat(coord_el.text)
+            desc_el = elem.find(DESC_PATH, NS)
+            when_el = elem.find(WHEN_PATH, NS)
             doodoo=(desc_el.text or "").strip() if desc_el is not None else None
             if doodoo is None:
                 continue
@@ -61,19 +111,21 @@ def convert(kml_path: str, geojson_path: str) -> None:
                     "lon": lon,
                 },
             })
-
-            elem.clear()      # free memory
     except ET.ParseError as e:
         # Keep whatever we managed to parse; warn the user.
         print(f"⚠️  XML stopped being well-formed at {e}. "
               f"Keeping {len(features)} features collected so far.", file=sys.stderr)
     finally:
-        opened.close()
+        mm.close()
+        os.close(fd)
 
     # ---------- write GeoJSON -------------
     out = {"type": "FeatureCollection", "features": features}
-    Path(geojson_path).write_text(json.dumps(out, ensure_ascii=False, indent=2),
-                                  encoding="utf-8")
+    if orjson:
+        Path(geojson_path).write_bytes(orjson.dumps(out, option=orjson.OPT_INDENT_2))
+    else:
+        Path(geojson_path).write_text(json.dumps(out, ensure_ascii=False, indent=2),
+                                      encoding="utf-8")
     print(f"✅  Wrote {len(features):,} point features →  {geojson_path}")
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""JSON encode/decode helpers – orjson when installed, stdlib json otherwise.
+
+orjson is only used where it gives exactly the stdlib's result: documents
+with ``NaN``/``Infinity`` literals or integers outside 64 bits are parsed by
+``json.loads``, and values orjson would print differently (exponent or
+non-finite floats, huge ints, non-str keys) are written by ``json.dumps``.
+Compact output keeps orjson's separators (no spaces after ``,``/``:``).
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+# orjson parses integers outside [-2**63, 2**64) as floats; every digit run
+# long enough to be one is checked (fraction/exponent digits are skipped)
+_LONG_INT = re.compile(rb"(?<![\d.eE+-])-?\d{19,}")
+
+
+_ALL_ZERO = bytes.maketrans(b"123456789", b"0" * 9)
+
+
+def _exact_ints(data: bytes) -> bool:
+    if data.translate(_ALL_ZERO).find(b"0" * 19) == -1:
+        return True  # no 19-digit run at all: the common, C-speed case
+    return all(-2**63 <= int(m) < 2**64 for m in _LONG_INT.findall(data))
+
+
+def _plain(obj: Any) -> bool:
+    """True if orjson encodes *obj* byte for byte like ``json.dumps``.
+
+    Indented output only: compact orjson writes ``,``/``:`` where
+    ``json.dumps`` writes ``, ``/``: ``; the values are the same."""
+    stack, seen = [obj], set()
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is str or t is bool or o is None:
+            continue
+        if t is int:
+            if not -2**63 <= o < 2**64:
+                return False
+        elif t is float:
+            # repr switches to an exponent outside [1e-4, 1e16); NaN/inf fail
+            if not (o == 0 or 1e-4 <= abs(o) < 1e16):
+                return False
+        elif t is dict or t is list or t is tuple:
+            if id(o) in seen:          # shared or circular: let json decide
+                return False
+            seen.add(id(o))
+            if t is dict:
+                if not all(type(k) is str for k in o):
+                    return False
+                stack.extend(o.values())
+            else:
+                stack.extend(o)
+        else:
+            return False
+    return True
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson:
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        if _exact_ints(raw):
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass  # NaN/Infinity literals: the stdlib accepts them
+    return json.loads(data)
+
+
+def dumps(obj: Any, *, indent: bool = False) -> bytes:
+    """Serialise *obj* to UTF-8 bytes (2-space indent when *indent*)."""
+    if orjson and _plain(obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except orjson.JSONEncodeError:
+            pass  # e.g. lone surrogates, nesting deeper than orjson allows
+    return json.dumps(obj, ensure_ascii=False,
+                      indent=2 if indent else None).encode("utf-8")
@@ -1,9 +1,9 @@
 from __future__ import annotations
-import argparse, json, logging, sys
+import argparse, logging, sys
 from pathlib import Path
 from rich.logging import RichHandler
 
-from geonext import __version__
+from geonext import __version__, _json
 from geonext.config import LOG_LEVEL, LOG_FILE, DEFAULT_PROVIDER
 from geonext.pipeline import run_pipeline
 from geonext.providers.openai_provider   import OpenAIProvider
@@ -39,11 +39,11 @@ def main(argv=None):
     log = logging.getLogger("geonext.cli")
     log.info("GeoNeXt %s – provider=%s", __version__, args.provider)
 
-    items = json.loads(Path(args.input).read_text())
-    provider = _get_provider(args.provider)
-    run_pipeline(items=items,
-                 provider=provider,
-                 out_path=Path(args.output))
+    items = _json.loads(Path(args.input).read_bytes())
+    with _get_provider(args.provider) as provider:
+        run_pipeline(items=items,
+                     provider=provider,
+                     out_path=Path(args.output))
 
 if __name__ == "__main__":
     main()
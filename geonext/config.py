@@ -7,12 +7,13 @@ load_dotenv()
 # MCP / Geocoder
 MCP_URL         = os.getenv("MCP_URL", "http://localhost:8000/mcp/")
 MCP_LABEL       = os.getenv("MCP_LABEL", "geonext")
+MCP_CONCURRENCY = int(os.getenv("MCP_CONCURRENCY", "32"))  # parallel geocode calls
 
 # LLM provider pick
 DEFAULT_PROVIDER = os.getenv("GEONEXT_PROVIDER", "openai").lower()
 
 # Output flushing
-FLUSH_EVERY     = int(os.getenv("GEONEXT_FLUSH", "1"))   # flush after N items
+FLUSH_EVERY     = int(os.getenv("GEONEXT_FLUSH", "1"))   # fsync checkpoint after N items
 
 #Stop on error
 STOP_ON_ERROR = int(os.getenv("STOP_ON_ERROR", "1"))
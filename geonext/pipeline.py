@@ -1,48 +1,89 @@
 from __future__ import annotations
-import json, logging
+import logging, os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from geonext import _json
 from geonext.utils import deep_to_str
 from geonext.config import FLUSH_EVERY, STOP_ON_ERROR
 from tqdm import tqdm
 
 log = logging.getLogger("geonext.pipeline")
 
+def _checkpoint_path(out_path: Path) -> Path:
+    """Append-only NDJSON file holding one finished item per line."""
+    return out_path.with_name(out_path.name + ".ndjson")
+
+def _count_records(ckpt: Path) -> int:
+    """Count complete lines in *ckpt*, truncating a torn trailing write."""
+    count = size = 0
+    with ckpt.open("rb") as fh:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            size += len(line)
+    if size != ckpt.stat().st_size:
+        with ckpt.open("r+b") as fh:
+            fh.truncate(size)
+    return count
+
 def run_pipeline(*,
                  items: list[dict],
                  provider,
                  out_path: Path):
 
-    results: list[dict] = []
-    if out_path.exists():                         # resume
-        results = json.loads(out_path.read_text())
+    ckpt = _checkpoint_path(out_path)
+    if not ckpt.exists() and out_path.exists():  # resume from a previous .json
+        with ckpt.open("wb") as fh:
+            for rec in _json.loads(out_path.read_bytes()):
+                fh.write(_json.dumps(rec))
+                fh.write(b"\n")
 
-    start_idx = len(results)
+    start_idx = _count_records(ckpt) if ckpt.exists() else 0
     log.info("Resuming at index %s / %s", start_idx, len(items))
 
     bar = tqdm(total=len(items), initial=start_idx, unit="doc")
 
-    for idx in range(start_idx, len(items)):
-        item = items[idx]
-        text = deep_to_str(item)                  # flatten nested JSON->str
-        try:
-            log.info("Processing item %s:\n%s", idx, text)
-            locs = provider.run(text=text)
-        except Exception as exc:
-            log.exception("Provider failed on index %s: %s", idx, exc)
-            if STOP_ON_ERROR == 1:
-                raise
-            locs = {"error": str(exc)}
-
-        # attach the geolocation results back onto the original item
-        item['geolocation'] = locs
-        results.append(item)
-
-        # periodically flush partial results back out
-        if (idx + 1) % FLUSH_EVERY == 0:
-            out_path.write_text(json.dumps(results, indent=2, ensure_ascii=False))
-
-        bar.update(1)
-
-    # final write
-    out_path.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    # Flatten the next item on a helper thread while the provider call
+    # (network-bound, GIL released) is in flight for the current one; only
+    # one prompt is ever built ahead.
+    flattener = ThreadPoolExecutor(max_workers=1,
+                                   thread_name_prefix="geonext-flatten")
+    try:
+        if start_idx < len(items):
+            ahead = flattener.submit(deep_to_str, items[start_idx])
+        with ckpt.open("ab") as fh:
+            for idx in range(start_idx, len(items)):
+                item = items[idx]
+                text = ahead.result()           # flatten nested JSON->str
+                if idx + 1 < len(items):
+                    ahead = flattener.submit(deep_to_str, items[idx + 1])
+                try:
+                    log.info("Processing item %s:\n%s", idx, text)
+                    locs = provider.run(text=text)
+                except Exception as exc:
+                    log.exception("Provider failed on index %s: %s", idx, exc)
+                    if STOP_ON_ERROR == 1:
+                        raise
+                    locs = {"error": str(exc)}
+
+                # attach the geolocation results back onto the original item
+                item['geolocation'] = locs
+
+                # append only the new record; make it durable periodically
+                fh.write(_json.dumps(item))
+                fh.write(b"\n")
+                if (idx + 1) % FLUSH_EVERY == 0:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+
+                bar.update(1)
+    finally:
+        flattener.shutdown(cancel_futures=True)
+
+    # final write – assemble the JSON array once from the checkpoint
+    with ckpt.open("rb") as fh:
+        results = [_json.loads(line) for line in fh]
+    out_path.write_bytes(_json.dumps(results, indent=True))
+    ckpt.unlink()
     bar.close()
@@ -2,8 +2,20 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 
 class Provider(ABC):
-    """Common interface every provider must implement."""
+    """Common interface every provider must implement.
+
+    Providers are context managers; ``close()`` releases whatever clients
+    or connection pools they hold."""
 
     @abstractmethod
     def run(self, *, text: str) -> list[dict]:
         """Return GeoNeXt final JSON (already geocoded)"""
+
+    def close(self) -> None:
+        """Release network resources (nothing to do by default)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,32 +1,80 @@
 from __future__ import annotations
-import json, logging, requests, os
+import asyncio, logging, os, threading
+import httpx
 from mistralai.client import MistralClient
+from geonext import _json
+from geonext.providers.base import Provider
 from geonext.prompts  import FALLBACK_PROMPT
-from geonext.config   import MCP_URL
+from geonext.config   import MCP_URL, MCP_CONCURRENCY
 
 log = logging.getLogger("geonext.mistral")
 
-def _call_mcp(location: str) -> dict|None:
+async def _call_mcp(client: httpx.AsyncClient, sema: asyncio.Semaphore,
+                    location: str) -> dict|None:
     """Minimal HTTP client for /call/geocode_location."""
     payload = {
         "tool_name": "geocode_location",
         "args":      {"location": location, "max_results": 1}
     }
     try:
-        r = requests.post(f"{MCP_URL.rstrip('/')}/call",
-                          json=payload, timeout=30)
+        async with sema:                    # respect MCP-server rate limits
+            r = await client.post(f"{MCP_URL.rstrip('/')}/call", json=payload)
         r.raise_for_status()
-        data = r.json()
+        data = _json.loads(r.content)
         return data["result"][0] if data["result"] else None
     except Exception as exc:
         log.warning("MCP call failed: %s", exc)
         return None
 
-class MistralProvider:
+class MistralProvider(Provider):
     MODEL = "mistral-large-latest"
 
     def __init__(self):
         self.client = MistralClient(api_key=os.getenv("MISTRAL_API_KEY"))
+        # one private loop per provider, running on its own thread: the
+        # pooled AsyncClient (and its keep-alive connections) survives from
+        # one document to the next, and run() also works when the caller is
+        # itself inside an event loop
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="geonext-mistral-io",
+                                        daemon=True)
+        self._thread.start()
+        self._call(self._open())
+
+    def _call(self, coro):
+        """Run *coro* on the provider's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _open(self) -> None:
+        # created on the loop that will use them
+        self._http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64),
+            timeout=30,
+        )
+        self._sema = asyncio.Semaphore(MCP_CONCURRENCY)
+
+    async def _geocode_all(self, queries: list[str]) -> list[dict|None]:
+        return await asyncio.gather(
+            *(_call_mcp(self._http, self._sema, q) for q in queries)
+        )
+
+    def close(self) -> None:
+        """Close the pooled connections and stop the loop (idempotent).
+
+        Also safe on a provider whose ``__init__`` failed part-way."""
+        loop = getattr(self, "_loop", None)
+        if loop is None or loop.is_closed():
+            return
+        thread = getattr(self, "_thread", None)
+        if thread is not None and thread.is_alive():
+            http = getattr(self, "_http", None)  # unset if _open() failed
+            if http is not None:
+                self._call(http.aclose())
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        loop.close()
 
     def run(self, *, text: str) -> list[dict]:
         # 1) ask Mistral to *only* list query strings
@@ -39,15 +87,17 @@ class MistralProvider:
             temperature=0
         )
         try:
-            queries = json.loads(resp.choices[0].message.content)
+            queries = _json.loads(resp.choices[0].message.content)
         except Exception as exc:
             log.error("Bad JSON from Mistral: %s", exc)
             raise
 
-        # 2) de-dupe & geocode via MCP ourselves
+        # 2) de-dupe & geocode via MCP ourselves (all queries concurrently)
+        queries = sorted(set(queries))
+        geos = self._call(self._geocode_all(queries))
         seen, results = set(), []
-        for q in sorted(set(queries)):
-            if (geo := _call_mcp(q)):
+        for q, geo in zip(queries, geos):
+            if geo:
                 key = (round(float(geo["latitude"]), 4),
                        round(float(geo["longitude"]), 4))
                 if key in seen:
@@ -1,13 +1,14 @@
 # providers/openai_provider.py
 from __future__ import annotations
 
-import datetime
-import json
 import logging
 import os
+import time
 from typing import Any, Dict, List
 
 import openai
+from geonext import _json
+from geonext.providers.base import Provider
 from geonext.prompts import SYSTEM_PROMPT
 from geonext.config import MCP_URL, MCP_LABEL
 from geonext.utils import extract_json
@@ -16,7 +17,7 @@ from geonext.prompts import LOCATION_SCHEMA
 log = logging.getLogger("geonext.openai")
 
 
-class OpenAIProvider:
+class OpenAIProvider(Provider):
     """Wraps calls to the OpenAI Responses API and stores each raw HTTP
     response in its own JSON file inside a dedicated *responses/* folder so
     developers can inspect them later.
@@ -46,14 +47,18 @@ class OpenAIProvider:
     # ------------------------------------------------------------------
 
     def _response_filename(self) -> str:
-        """Generate a unique filename like *response_20250803_142501_123456.json*."""
-        ts = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
-        return os.path.join(self.responses_dir, f"response_{ts}.json")
+        """Generate a unique, sortable filename like *response_1754230101123456789.json*
+        (nanoseconds since the epoch)."""
+        return os.path.join(self.responses_dir, f"response_{time.time_ns()}.json")
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
+    def close(self) -> None:
+        """Close the OpenAI client's connection pool."""
+        self.client.close()
+
     def run(self, *, text: str) -> List[Dict[str, Any]]:
         """Return GeoNeXt JSON for one document and archive the raw response."""
         try:
@@ -69,14 +74,14 @@ class OpenAIProvider:
 
             # Persist full raw response for debugging
             try:
-                with open(self._response_filename(), "w", encoding="utf-8") as fh:
-                    json.dump(resp.model_dump(), fh, indent=2, ensure_ascii=False)
+                with open(self._response_filename(), "wb") as fh:
+                    fh.write(_json.dumps(resp.model_dump(), indent=True))
             except Exception:
                 log.exception("Failed to write response to disk.")
 
             # Extract the assistant‑formatted JSON payload
             json_str = resp.output[-1].content[0].text
-            return json.loads(json_str)
+            return _json.loads(json_str)
 
         except Exception:
             # Let the caller decide what to do with unexpected errors
@@ -1,13 +1,40 @@
 from __future__ import annotations
 import json, collections
-import re
+from geonext import _json
 def deep_to_str(obj, indent: int = 2) -> str:
-    """Pretty‑prints any nested JSON/dict/list as a compact string for LLM."""
+    """Pretty‑prints any nested JSON/dict/list as a compact string for LLM.
+
+    The default 2-space layout goes through orjson when it is installed and
+    would print the same text (see geonext._json); everything else uses the
+    stdlib encoder."""
+    if indent == 2:
+        try:
+            return _json.dumps(obj, indent=True).decode("utf-8")
+        except UnicodeEncodeError:  # lone surrogates only fit in a str
+            pass
     return json.dumps(obj, ensure_ascii=False, indent=indent)
 
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i
+
 def extract_json(text: str) -> str:
-    # Match code block: ```json ... ```
-    match = re.search(r"```(?:json)?\s*(\[.*?\])\s*```", text, re.DOTALL)
-    if match:
-        return match.group(1)
+    # Match code block: ```json ... ``` – the first fence that opens a JSON
+    # array, up to the first ']' closed by a fence.  Plain str.find scans,
+    # same result as r"```(?:json)?\s*(\[.*?\])\s*```" without backtracking.
+    fence = text.find("```")
+    while fence != -1:
+        i = fence + 3
+        if text.startswith("json", i):
+            i += 4
+        start = _skip_ws(text, i)
+        if text.startswith("[", start):
+            end = text.find("]", start)
+            while end != -1:
+                if text.startswith("```", _skip_ws(text, end + 1)):
+                    return text[start:end + 1]
+                end = text.find("]", end + 1)
+            break  # no closing "]```" after this one, so none after later ones
+        fence = text.find("```", fence + 1)
     raise ValueError("No valid JSON found in output.")
\ No newline at end of file
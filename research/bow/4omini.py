@@ -8,7 +8,7 @@ on a *subset* of GeoCorpora to keep token-cost down.
 
 * Zero-shot (`--shots 0`) or 1-shot (`--shots 1`)
 * Evaluates up to `--limit` tweets (default 1000)
-* Caches every response under cache_llm/ so reruns are free
+* Caches every response in one local store (see _cache.py) so reruns are free
 * Prints token-level precision / recall / F1 identical to the BoW script
 
 Usage
@@ -25,86 +25,29 @@ from __future__ import annotations
 
 import argparse
 import json
-import random
-import re
 import sys
-from hashlib import sha1
-from pathlib import Path
-from typing import List, Tuple
+from typing import List
 
 import numpy as np
 from openai import OpenAI
 from sklearn.metrics import classification_report
 from tqdm.auto import tqdm
 
+import _cache  # sibling module: single-store response cache
+import _llm  # sibling module: cache keys + answer parsing
+from _corpus import TOKEN_RE, json_dumps, load_gc  # sibling module: GeoCorpora reader
+
 # ------------------------------------------------------------------#
 # crude tokeniser (same regex used in BoW baseline)                 #
 # ------------------------------------------------------------------#
-TOKEN_RE = re.compile(r"\w+|[^\w\s]")
-
-
 def tokenize(text: str) -> List[str]:
     return TOKEN_RE.findall(text)
 
 
-# ------------------------------------------------------------------#
-# minimal GeoCorpora JSON loader (array or JSON-Lines)              #
-# ------------------------------------------------------------------#
-def load_gc(path: str) -> Tuple[List[str], List[List[int]]]:
-    """Return tweet texts and gold BIO tags (0=O,1=LOC)."""
-    raw = re.sub(r":\s*NaN", ": null", Path(path).read_text("utf-8"))
-    records = (
-        json.loads(raw)
-        if raw.lstrip().startswith("[")
-        else [json.loads(l) for l in raw.splitlines() if l.strip()]
-    )
-
-    texts, tags = [], []
-    for obj in records:
-        tweet = obj.get("text") or obj.get("tweet_text")
-        if not tweet:
-            continue
-        toks = tokenize(tweet)
-
-        # char-offset → token index
-        offset_map, pos = {}, 0
-        for i, tok in enumerate(toks):
-            start = tweet.find(tok, pos)
-            if start == -1:
-                start = pos
-            for c in range(start, start + len(tok)):
-                offset_map[c] = i
-            pos = start + len(tok)
-
-        lab = [0] * len(toks)
-        for ent in obj.get("entities", []):
-            if (
-                ent.get("entity_type", "LOC").upper()
-                not in {"LOCATION", "LOC", "GPE"}
-            ):
-                continue
-            if "indices" in ent:
-                s, e = ent["indices"]
-            elif ent.get("char_position") and ent.get("text"):
-                s = int(float(ent["char_position"]))
-                e = s + len(ent["text"])
-            else:
-                continue
-            for c in range(s, e):
-                if c in offset_map:
-                    lab[offset_map[c]] = 1
-
-        texts.append(tweet)
-        tags.append(lab)
-    return texts, tags
-
-
 # ------------------------------------------------------------------#
 # OpenAI chat wrapper + SHA-1 cache                                 #
 # ------------------------------------------------------------------#
 client = OpenAI()
-CACHE_DIR = Path("cache_llm")
-CACHE_DIR.mkdir(exist_ok=True)
 
 SYSTEM_MSG = (
     "You are a helpful assistant that extracts location names "
@@ -119,10 +62,10 @@ FEW_SHOT = {
 
 
 def llm_extract(text: str, shots: int) -> List[str]:
-    key = sha1(f"{shots}_{text}".encode()).hexdigest()[:16]
-    cache_file = CACHE_DIR / f"{key}.json"
-    if cache_file.exists():
-        return json.loads(cache_file.read_text())
+    key = _llm.cache_key(text, shots)
+    locs = _llm.cached(key)
+    if locs is not None:
+        return locs
 
     messages = [{"role": "system", "content": SYSTEM_MSG}]
     if shots:
@@ -133,25 +76,29 @@ def llm_extract(text: str, shots: int) -> List[str]:
     rsp = client.chat.completions.create(
         model="o4-mini", messages=messages
     )
-    try:
-        locs = json.loads(rsp.choices[0].message.content)
-    except Exception:
-        locs = []
-
-    cache_file.write_text(json.dumps(locs))
+    locs = _llm.parse_locs(rsp.choices[0].message.content)
+    _cache.put(key, json_dumps(locs))
     return locs
 
 
 # ------------------------------------------------------------------#
 # evaluation (token-level)                                          #
 # ------------------------------------------------------------------#
-def evaluate(texts: List[str], gold: List[List[int]], shots: int):
-    y_true, y_pred = [], []
-    for txt, g_tags in tqdm(list(zip(texts, gold)), desc="LLM extract"):
-        toks = tokenize(txt)
-        preds = [1 if t in set(llm_extract(txt, shots)) else 0 for t in toks]
-        y_true.extend(g_tags)
-        y_pred.extend(preds)
+def evaluate(
+    texts: List[str], gold: List[List[int]], all_toks: List[List[str]], shots: int
+):
+    # token labels go straight into preallocated arrays, one slice per tweet
+    off = np.cumsum([0] + [len(g) for g in gold])
+    y_true = np.empty(off[-1], dtype=np.int8)
+    y_pred = np.empty_like(y_true)
+    for i, (txt, g_tags, toks) in enumerate(tqdm(
+        list(zip(texts, gold, all_toks)), desc="LLM extract"
+    )):
+        loc_set = set(llm_extract(txt, shots))
+        y_true[off[i]:off[i + 1]] = g_tags
+        y_pred[off[i]:off[i + 1]] = np.fromiter(
+            (t in loc_set for t in toks), dtype=np.int8, count=len(toks)
+        )
 
     print(f"\n[LLM] o4-mini  | shots = {shots}")
     print(
@@ -176,14 +123,9 @@ def main():
     )
     args = p.parse_args()
 
-    texts, tags = load_gc(args.geocorpora)
-    if args.limit and len(texts) > args.limit:
-        rnd = random.Random(42)
-        idx = rnd.sample(range(len(texts)), args.limit)
-        texts = [texts[i] for i in idx]
-        tags = [tags[i] for i in idx]
+    texts, tags, toks = load_gc(args.geocorpora, args.limit)
 
-    evaluate(texts, tags, args.shots)
+    evaluate(texts, tags, toks, args.shots)
 
 
 if __name__ == "__main__":
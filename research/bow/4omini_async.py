@@ -6,82 +6,25 @@ from __future__ import annotations
 import argparse
 import asyncio
 import json
-import random
-import re
-from hashlib import sha1
-from pathlib import Path
 from typing import List, Tuple
 
 import numpy as np
-from openai import AsyncOpenAI, RateLimitError
 from sklearn.metrics import classification_report
 from tqdm.asyncio import tqdm_asyncio  # progress bar for coroutines
 
+import _llm  # sibling module: cached/batched chat requests
+from _corpus import TOKEN_RE, load_gc  # sibling module: GeoCorpora reader
+
 # ------------------------------------------------------------------#
 # crude tokeniser (same regex used in BoW baseline)                 #
 # ------------------------------------------------------------------#
-TOKEN_RE = re.compile(r"\w+|[^\w\s]")
-
-
 def tokenize(text: str) -> List[str]:
     return TOKEN_RE.findall(text)
 
 
 # ------------------------------------------------------------------#
-# minimal GeoCorpora JSON loader (array or JSON-Lines)              #
+# prompts (requests, retries and caching live in _llm.py)           #
 # ------------------------------------------------------------------#
-def load_gc(path: str) -> Tuple[List[str], List[List[int]]]:
-    """Return tweet texts and gold BIO tags (0=O, 1=LOC)."""
-    raw = re.sub(r":\s*NaN", ": null", Path(path).read_text("utf-8"))
-    records = (
-        json.loads(raw)
-        if raw.lstrip().startswith("[")
-        else [json.loads(l) for l in raw.splitlines() if l.strip()]
-    )
-
-    texts, tags = [], []
-    for obj in records:
-        tweet = obj.get("text") or obj.get("tweet_text")
-        if not tweet:
-            continue
-        toks = tokenize(tweet)
-
-        # char-offset → token index
-        offset_map, pos = {}, 0
-        for i, tok in enumerate(toks):
-            start = tweet.find(tok, pos)
-            if start == -1:
-                start = pos
-            for c in range(start, start + len(tok)):
-                offset_map[c] = i
-            pos = start + len(tok)
-
-        lab = [0] * len(toks)
-        for ent in obj.get("entities", []):
-            if ent.get("entity_type", "LOC").upper() not in {"LOCATION", "LOC", "GPE"}:
-                continue
-            if "indices" in ent:
-                s, e = ent["indices"]
-            elif ent.get("char_position") and ent.get("text"):
-                s = int(float(ent["char_position"]))
-                e = s + len(ent["text"])
-            else:
-                continue
-            for c in range(s, e):
-                if c in offset_map:
-                    lab[offset_map[c]] = 1
-
-        texts.append(tweet)
-        tags.append(lab)
-    return texts, tags
-
-
-# ------------------------------------------------------------------#
-# OpenAI chat wrapper + SHA-1 cache                                 #
-# ------------------------------------------------------------------#
-CACHE_DIR = Path("cache_llm")
-CACHE_DIR.mkdir(exist_ok=True)
-
 SYSTEM_MSG = (
     "You are a helpful assistant that extracts location names "
     "(toponyms) from text. Return them as a JSON array of strings, "
@@ -94,15 +37,17 @@ FEW_SHOT = {
 }
 
 
-async def llm_extract_async(
-    text: str, shots: int, client: AsyncOpenAI, sema: asyncio.Semaphore
-) -> List[str]:
-    """One-tweet extraction with caching + rate-limit retries."""
-    key = sha1(f"{shots}_{text}".encode()).hexdigest()[:16]
-    cache_file = CACHE_DIR / f"{key}.json"
-    if cache_file.exists():
-        return json.loads(cache_file.read_text())
+BATCH_MSG = (
+    "You are a helpful assistant that extracts location names "
+    "(toponyms) from several numbered texts. Return ONLY a JSON object "
+    "mapping each text's number (as a string) to a JSON array of its "
+    "location names, exactly as they appear in that text, e.g. "
+    '{"1": ["Kharkiv"], "2": []}.'
+)
+
 
+def prompt(text: str, shots: int) -> List[dict]:
+    """Chat messages asking for the locations in one tweet."""
     messages = [{"role": "system", "content": SYSTEM_MSG}]
     if shots:
         messages += [
@@ -110,26 +55,19 @@ async def llm_extract_async(
             {"role": "assistant", "content": json.dumps(FEW_SHOT["locs"])},
         ]
     messages.append({"role": "user", "content": text})
+    return messages
 
-    backoff = 1.0
-    while True:  # retry loop
-        async with sema:  # cap concurrency
-            try:
-                rsp = await client.chat.completions.create(
-                    model="o4-mini", messages=messages
-                )
-                break
-            except RateLimitError:
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, 30)  # ceil at 30 s
-
-    try:
-        locs = json.loads(rsp.choices[0].message.content or "[]")
-    except Exception:
-        locs = []
 
-    cache_file.write_text(json.dumps(locs))
-    return locs
+def batch_prompt(texts: List[str], shots: int) -> List[dict]:
+    """Chat messages asking for the locations in several numbered tweets."""
+    messages = [{"role": "system", "content": BATCH_MSG}]
+    if shots:
+        messages += [
+            {"role": "user", "content": _llm.numbered([FEW_SHOT["text"]])},
+            {"role": "assistant", "content": json.dumps({"1": FEW_SHOT["locs"]})},
+        ]
+    messages.append({"role": "user", "content": _llm.numbered(texts)})
+    return messages
 
 
 # ------------------------------------------------------------------#
@@ -138,25 +76,62 @@ async def llm_extract_async(
 async def evaluate_async(
     texts: List[str],
     gold: List[List[int]],
+    all_toks: List[List[str]],
     shots: int,
     concurrency: int,
+    batch_size: int = 1,
 ):
-    client = AsyncOpenAI()
+    client = _llm.make_client(concurrency)
     sema = asyncio.Semaphore(concurrency)
 
-    # launch all requests
-    tasks = [
-        llm_extract_async(txt, shots, client, sema) for txt in texts
-    ]
-    all_locs = await tqdm_asyncio.gather(*tasks, desc="LLM extract")
-
-    # flatten predictions + gold for classification_report
-    y_true, y_pred = [], []
-    for txt, g_tags, locs in zip(texts, gold, all_locs):
-        toks = tokenize(txt)
-        loc_set = set(locs)
-        y_true.extend(g_tags)
-        y_pred.extend([1 if t in loc_set else 0 for t in toks])
+    def key(text: str) -> str:
+        return _llm.cache_key(text, shots)
+
+    def batch_key(text: str) -> str:
+        return _llm.cache_key(text, shots, batch=True)
+
+    async def ask(text: str) -> str:
+        return await _llm.chat(client, sema, prompt(text, shots))
+
+    async def ask_batch(batch: List[str]) -> str:
+        return await _llm.chat(client, sema, batch_prompt(batch, shots))
+
+    # predictions + gold for classification_report, written straight into
+    # preallocated arrays (one slice per tweet) as each result arrives
+    off = np.cumsum([0] + [len(g) for g in gold])
+    y_true = np.empty(off[-1], dtype=np.int8)
+    y_pred = np.empty_like(y_true)
+
+    def score(i: int, locs: List[str]) -> None:
+        loc_set, toks = set(locs), all_toks[i]
+        y_true[off[i]:off[i + 1]] = gold[i]
+        y_pred[off[i]:off[i + 1]] = np.fromiter(
+            (t in loc_set for t in toks), dtype=np.int8, count=len(toks)
+        )
+
+    # cache hits are scored up front; only the misses become coroutines
+    keys = (batch_key, key) if batch_size > 1 else (key,)
+    misses = []
+    for i, txt in enumerate(texts):
+        locs = _llm.lookup(txt, *keys)
+        if locs is None:
+            misses.append(i)
+        else:
+            score(i, locs)
+
+    async def extract(idx: List[int]) -> Tuple[List[int], List[List[str]]]:
+        if batch_size > 1:
+            batch = [texts[i] for i in idx]
+            return idx, await _llm.batch_extract(batch, key, batch_key, ask, ask_batch)
+        return idx, [await _llm.extract(texts[idx[0]], key, ask)]
+
+    # launch the remaining requests and score them in completion order
+    step = max(batch_size, 1)
+    tasks = [extract(misses[j:j + step]) for j in range(0, len(misses), step)]
+    for done in tqdm_asyncio.as_completed(tasks, desc="LLM extract"):
+        idx, results = await done
+        for i, locs in zip(idx, results):
+            score(i, locs)
 
     print(f"\n[LLM] o4-mini | shots = {shots} | concurrency = {concurrency}")
     print(classification_report(y_true, y_pred, target_names=["O", "LOC"], digits=3))
@@ -181,16 +156,21 @@ def main():
         default=100,
         help="simultaneous OpenAI requests (default 100)",
     )
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="tweets packed into one request (default 1 = no batching)",
+    )
     args = p.parse_args()
 
-    texts, tags = load_gc(args.geocorpora)
-    if args.limit and len(texts) > args.limit:
-        rnd = random.Random(42)
-        idx = rnd.sample(range(len(texts)), args.limit)
-        texts = [texts[i] for i in idx]
-        tags = [tags[i] for i in idx]
+    texts, tags, toks = load_gc(args.geocorpora, args.limit)
 
-    asyncio.run(evaluate_async(texts, tags, args.shots, args.concurrency))
+    asyncio.run(
+        evaluate_async(
+            texts, tags, toks, args.shots, args.concurrency, args.batch_size
+        )
+    )
 
 
 if __name__ == "__main__":
@@ -7,75 +7,25 @@ from __future__ import annotations
 import argparse
 import asyncio
 import json
-import random
-import re
 import sys
-from hashlib import sha1
-from pathlib import Path
 from typing import List, Tuple
 
 import numpy as np
-from openai import AsyncOpenAI, RateLimitError
 from sklearn.metrics import classification_report
 from tqdm.asyncio import tqdm_asyncio
 
+import _llm  # sibling module: cached/batched chat requests
+from _corpus import TOKEN_RE, load_gc  # sibling module: GeoCorpora reader
+
 # ──────────────────────────────────────────────────────────────────────
 # tokeniser (same regex as BoW baseline)
 # ──────────────────────────────────────────────────────────────────────
-TOKEN_RE = re.compile(r"\w+|[^\w\s]")
-
 def tokenize(text: str) -> List[str]:
     return TOKEN_RE.findall(text)
 
 # ──────────────────────────────────────────────────────────────────────
-# minimal GeoCorpora JSON loader (array or JSONL)
-# ──────────────────────────────────────────────────────────────────────
-def load_gc(path: str) -> Tuple[List[str], List[List[int]]]:
-    txt = re.sub(r":\s*NaN", ": null", Path(path).read_text("utf-8"))
-    recs = json.loads(txt) if txt.lstrip().startswith("[") else [json.loads(l) for l in txt.splitlines() if l.strip()]
-
-    texts, tags = [], []
-    for obj in recs:
-        tweet = obj.get("text") or obj.get("tweet_text")
-        if not tweet:
-            continue
-        toks = tokenize(tweet)
-
-        # char-offset → token index
-        o2t, pos = {}, 0
-        for i, tok in enumerate(toks):
-            start = tweet.find(tok, pos)
-            if start == -1:
-                start = pos
-            for c in range(start, start + len(tok)):
-                o2t[c] = i
-            pos = start + len(tok)
-
-        lab = [0] * len(toks)
-        for ent in obj.get("entities", []):
-            if ent.get("entity_type", "LOC").upper() not in {"LOCATION", "LOC", "GPE"}:
-                continue
-            if "indices" in ent:
-                s, e = ent["indices"]
-            elif ent.get("char_position") and ent.get("text"):
-                s = int(float(ent["char_position"]))
-                e = s + len(ent["text"])
-            else:
-                continue
-            for c in range(s, e):
-                if c in o2t:
-                    lab[o2t[c]] = 1
-
-        texts.append(tweet)
-        tags.append(lab)
-    return texts, tags
-
-# ──────────────────────────────────────────────────────────────────────
-# OpenAI async wrapper + SHA-1 cache
+# prompts (requests, retries and caching live in _llm.py)
 # ──────────────────────────────────────────────────────────────────────
-CACHE_DIR = Path("cache_llm"); CACHE_DIR.mkdir(exist_ok=True)
-client = AsyncOpenAI()
-
 SYSTEM = (
     "You are a meticulous information extraction assistant.\n"
     "Task: identify every word or phrase that is a GEOgraphic location "
@@ -95,60 +45,86 @@ EX2 = {
     "locs": ["New York City"],
 }
 
-async def llm_extract(text: str, shots: int, sema: asyncio.Semaphore) -> List[str]:
-    key = sha1(f"{shots}_{text}".encode()).hexdigest()[:16]
-    cpath = CACHE_DIR / f"{key}.json"
-    if cpath.exists():
-        return json.loads(cpath.read_text())
-
-    msgs = [{"role": "system", "content": SYSTEM}]
-    if shots >= 1:
-        msgs += [
-            {"role": "user", "content": EX1["text"]},
-            {"role": "assistant", "content": json.dumps(EX1["locs"])},
-        ]
-    if shots == 2:
-        msgs += [
-            {"role": "user", "content": EX2["text"]},
-            {"role": "assistant", "content": json.dumps(EX2["locs"])},
-        ]
-    msgs.append({"role": "user", "content": text})
-
-    backoff = 1.0
-    while True:
-        async with sema:
-            try:
-                rsp = await client.chat.completions.create(
-                    model="o4-mini",
-                    messages=msgs,
-                    top_p=0.0,
-                )
-                break
-            except RateLimitError:
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, 30)
-
-    try:
-        locs = json.loads(rsp.choices[0].message.content or "[]")
-    except Exception:
-        locs = []
-
-    cpath.write_text(json.dumps(locs))
-    return locs
+BATCH_SYSTEM = (
+    SYSTEM + "\n"
+    "You will receive several numbered texts. Return **only** a JSON object "
+    "mapping each text's number (as a string) to the JSON array of location "
+    'names found in that text, e.g. {"1": ["Lviv"], "2": []}.'
+)
+
+def examples(shots: int, batched: bool = False) -> List[dict]:
+    msgs = []
+    for ex in (EX1, EX2)[:shots]:
+        if batched:
+            msgs += [
+                {"role": "user", "content": _llm.numbered([ex["text"]])},
+                {"role": "assistant", "content": json.dumps({"1": ex["locs"]})},
+            ]
+        else:
+            msgs += [
+                {"role": "user", "content": ex["text"]},
+                {"role": "assistant", "content": json.dumps(ex["locs"])},
+            ]
+    return msgs
 
 # ──────────────────────────────────────────────────────────────────────
 # evaluation
 # ──────────────────────────────────────────────────────────────────────
-async def evaluate(texts: List[str], gold: List[List[int]], shots: int, concur: int):
+async def evaluate(texts: List[str], gold: List[List[int]], all_toks: List[List[str]],
+                   shots: int, concur: int, batch: int = 1):
+    client = _llm.make_client(concur)
     sema = asyncio.Semaphore(concur)
-    tasks = [llm_extract(t, shots, sema) for t in texts]
-    preds = await tqdm_asyncio.gather(*tasks, desc="LLM extract")
 
-    y_true, y_pred = [], []
-    for txt, g, locs in zip(texts, gold, preds):
-        tset = set(locs)
-        y_true.extend(g)
-        y_pred.extend([1 if tok in tset else 0 for tok in tokenize(txt)])
+    def key(text: str) -> str:
+        return _llm.cache_key(text, shots)
+
+    def batch_key(text: str) -> str:
+        return _llm.cache_key(text, shots, batch=True)
+
+    async def ask(text: str) -> str:
+        msgs = [{"role": "system", "content": SYSTEM}, *examples(shots)]
+        msgs.append({"role": "user", "content": text})
+        return await _llm.chat(client, sema, msgs, top_p=0.0)
+
+    async def ask_batch(batch: List[str]) -> str:
+        msgs = [{"role": "system", "content": BATCH_SYSTEM}, *examples(shots, batched=True)]
+        msgs.append({"role": "user", "content": _llm.numbered(batch)})
+        return await _llm.chat(client, sema, msgs, top_p=0.0)
+
+    off = np.cumsum([0] + [len(g) for g in gold])   # tweet i owns off[i]:off[i+1]
+    y_true = np.empty(off[-1], dtype=np.int8)
+    y_pred = np.empty_like(y_true)
+
+    def score(i: int, locs: List[str]) -> None:
+        tset, toks = set(locs), all_toks[i]
+        y_true[off[i]:off[i + 1]] = gold[i]
+        y_pred[off[i]:off[i + 1]] = np.fromiter((tok in tset for tok in toks),
+                                                dtype=np.int8, count=len(toks))
+
+    # cache hits are scored here; only misses are scheduled as coroutines
+    keys = (batch_key, key) if batch > 1 else (key,)
+    misses = []
+    for i, t in enumerate(texts):
+        locs = _llm.lookup(t, *keys)
+        if locs is None:
+            misses.append(i)
+        else:
+            score(i, locs)
+
+    async def extract(idx: List[int]) -> Tuple[List[int], List[List[str]]]:
+        if batch > 1:
+            return idx, await _llm.batch_extract(
+                [texts[i] for i in idx], key, batch_key, ask, ask_batch
+            )
+        return idx, [await _llm.extract(texts[idx[0]], key, ask)]
+
+    # score each request as soon as it completes
+    step = max(batch, 1)
+    tasks = [extract(misses[j:j + step]) for j in range(0, len(misses), step)]
+    for done in tqdm_asyncio.as_completed(tasks, desc="LLM extract"):
+        idx, results = await done
+        for i, locs in zip(idx, results):
+            score(i, locs)
 
     print(f"\n[LLM] o4-mini | examples = {shots} | concurrency = {concur}")
     print(classification_report(y_true, y_pred, target_names=["O", "LOC"], digits=3))
@@ -165,16 +141,13 @@ def main():
                     help="max tweets to evaluate (default 1000)")
     ap.add_argument("--concurrency", type=int, default=100,
                     help="parallel OpenAI calls (default 100)")
+    ap.add_argument("--batch-size", type=int, default=1,
+                    help="tweets packed into one request (default 1 = no batching)")
     args = ap.parse_args()
 
-    texts, tags = load_gc(args.geocorpora)
-    if args.limit and len(texts) > args.limit:
-        rnd = random.Random(42)
-        pick = rnd.sample(range(len(texts)), args.limit)
-        texts = [texts[i] for i in pick]
-        tags = [tags[i] for i in pick]
+    texts, tags, toks = load_gc(args.geocorpora, args.limit)
 
-    asyncio.run(evaluate(texts, tags, args.examples, args.concurrency))
+    asyncio.run(evaluate(texts, tags, toks, args.examples, args.concurrency, args.batch_size))
 
 if __name__ == "__main__":
     main()
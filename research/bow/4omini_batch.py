@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+4omini_batch.py – o4-mini on GeoCorpora through the OpenAI Batch API
+====================================================================
+
+Same prompts, cache and token-level scoring as 4omini_async.py, but every
+cache miss is sent as *one* Batch API job (half price, separate rate-limit
+pool, results within 24 h) instead of one live request per tweet.
+
+* Uncached tweets are written to a JSONL request file and submitted
+* The job is polled every `--poll` seconds; answers go straight to the cache
+* Scoring then runs through 4omini_async.py – all hits, no live calls
+  (requests the batch failed on are retried there, online)
+* `--online` skips the Batch API and behaves exactly like 4omini_async.py
+* `--resume BATCH_ID` re-attaches to a job submitted by an earlier run
+
+Usage
+-----
+export OPENAI_API_KEY="sk-…"           # set your key
+
+# zero-shot on 1 000 tweets, offline batch
+python 4omini_batch.py --geocorpora geocorpora.json
+
+# re-attach after an interrupted poll
+python 4omini_batch.py --geocorpora geocorpora.json --resume batch_abc123
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from typing import Dict, List
+
+from openai import OpenAI
+
+import _cache  # sibling module: single-store response cache
+import _llm  # sibling module: cache keys + answer parsing
+from _corpus import json_dumps, json_loads, load_gc
+
+# prompts and scorer are shared with the async script
+base = importlib.import_module("4omini_async")
+
+ENDPOINT = "/v1/chat/completions"
+MAX_REQUESTS = 50_000     # Batch API limit per input file
+DONE = {"completed", "failed", "expired", "cancelled"}
+
+
+# ------------------------------------------------------------------#
+# Batch API round-trip                                              #
+# ------------------------------------------------------------------#
+def submit(client: OpenAI, todo: Dict[str, str], shots: int) -> List[str]:
+    """Upload one request per uncached tweet; return the batch ids."""
+    lines = [
+        json.dumps({
+            "custom_id": key,  # the cache key, so results land directly
+            "method": "POST",
+            "url": ENDPOINT,
+            "body": {"model": "o4-mini", "messages": base.prompt(text, shots)},
+        })
+        for key, text in todo.items()
+    ]
+    ids = []
+    for i in range(0, len(lines), MAX_REQUESTS):
+        payload = "\n".join(lines[i:i + MAX_REQUESTS]).encode()
+        upload = client.files.create(
+            file=("geocorpora_misses.jsonl", payload), purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=upload.id,
+            endpoint=ENDPOINT,
+            completion_window="24h",
+        )
+        n = min(MAX_REQUESTS, len(lines) - i)
+        print(f"[batch] submitted {batch.id} ({n} requests)")
+        ids.append(batch.id)
+    return ids
+
+
+def wait(client: OpenAI, batch_id: str, poll: float):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in DONE:
+            return batch
+        c = batch.request_counts
+        done = f"{c.completed + c.failed}/{c.total}" if c else "?"
+        print(f"[batch] {batch_id}: {batch.status} ({done})")
+        time.sleep(poll)
+
+
+def collect(client: OpenAI, batch) -> int:
+    """Cache every successful answer of a finished batch; return the count.
+
+    Failed requests (per-request errors, non-200 responses, malformed
+    bodies, lines only in the error file) are left uncached, so scoring
+    retries them online; their custom_ids are printed.
+    """
+    n, failed = 0, []
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json_loads(line)
+            except ValueError:
+                rec = {}
+            content = _llm.batch_answer(rec)
+            if content is None or "custom_id" not in rec:
+                failed.append(rec.get("custom_id", "?"))
+                continue
+            _cache.put(rec["custom_id"], json_dumps(_llm.parse_locs(content)))
+            n += 1
+        _cache.flush()
+    if batch.error_file_id:
+        for line in client.files.content(batch.error_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json_loads(line)
+            except ValueError:
+                rec = {}
+            failed.append(rec.get("custom_id", "?"))
+    if failed:
+        shown = ", ".join(failed[:10]) + (", …" if len(failed) > 10 else "")
+        print(f"[batch] {batch.id}: {len(failed)} requests failed "
+              f"(retried online): {shown}")
+    return n
+
+
+# ------------------------------------------------------------------#
+# CLI                                                               #
+# ------------------------------------------------------------------#
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--geocorpora", required=True)
+    p.add_argument("--shots", type=int, default=0, choices=[0, 1])
+    p.add_argument(
+        "--limit",
+        type=int,
+        default=1000,
+        help="max tweets to evaluate (default 1000)",
+    )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=100,
+        help="simultaneous requests for anything left online (default 100)",
+    )
+    p.add_argument(
+        "--poll",
+        type=float,
+        default=30,
+        help="seconds between batch status checks (default 30)",
+    )
+    p.add_argument("--resume", nargs="+", metavar="BATCH_ID",
+                   help="collect already submitted batch job(s)")
+    p.add_argument("--online", action="store_true",
+                   help="skip the Batch API, send live requests instead")
+    args = p.parse_args()
+
+    texts, tags, toks = load_gc(args.geocorpora, args.limit)
+
+    if not args.online:
+        client = OpenAI()
+        ids = args.resume
+        if not ids:
+            misses = [t for t in texts
+                      if _llm.cached(_llm.cache_key(t, args.shots)) is None]
+            # one request per distinct tweet (custom_id must be unique)
+            todo = {_llm.cache_key(t, args.shots): t for t in misses}
+            print(f"[batch] {len(texts) - len(misses)} cached, "
+                  f"{len(todo)} to request")
+            ids = submit(client, todo, args.shots) if todo else []
+        for batch_id in ids:
+            batch = wait(client, batch_id, args.poll)
+            print(f"[batch] {batch_id}: {batch.status}, "
+                  f"{collect(client, batch)} answers cached")
+
+    asyncio.run(
+        base.evaluate_async(texts, tags, toks, args.shots, args.concurrency)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,20 @@ Improvements vs. 4omini_async.py
 --------------------------------
 * Works with *any* chat model (`--model`, default **o4-mini**)
 * Accepts multiple shot counts in one run (`--shots 0 1 3 …`)
-* Robust exponential back-off on **RateLimitError** *and* **APIError**
-* Per-tweet SHA-1 cache remains under  `cache_llm/`  (same layout)
+* Raw `aiohttp` POSTs to `/chat/completions` (one pooled session shared
+  by every shot setting)
+* `--batch-size K` packs K uncached tweets into one JSON-mode request
+  (answers are still cached per tweet)
+* Optional `--rpm` / `--tpm` token buckets keep requests under the account's
+  rate limits up front instead of bouncing off 429s
+* Robust exponential back-off on **429** *and* **5xx** / connection errors
+  / 200s whose body is not a completion (a 429's `Retry-After` is honoured);
+  a request the API rejects (other 4xx) is logged and scored as no
+  prediction, only 401/403/404 (key, access, model) stop the run
+* Per-tweet SHA-1 cache shared with the other scripts (`_cache`: one LMDB /
+  SQLite store, legacy `cache_llm/*.json` imported on first use)
+* `--use-batch-api` sends every cache miss as one Batch API job (half price,
+  separate rate-limit pool) and scores from the cache once it completes
 * Deterministic subsampling with `--limit` + `--seed`
 * Much cleaner asyncio + tqdm glue
 * Prints **precision / recall / F1** in one table for every shot setting
@@ -21,23 +33,35 @@ export OPENAI_API_KEY="sk-…"                # set your key
 python llm_geocorpora_eval.py \
     --geocorpora geocorpora.json --shots 0 1 \
     --limit 1000 --concurrency 200
+
+# Same, but through the Batch API (results within 24 h)
+python llm_geocorpora_eval.py \
+    --geocorpora geocorpora.json --shots 0 1 --use-batch-api
 """
 from __future__ import annotations
 
 import argparse
 import asyncio
 import json
+import os
 import random
 import re
+import time
+from functools import lru_cache
 from hashlib import sha1
 from pathlib import Path
 from typing import List
 
+import aiohttp
 import numpy as np
-from openai import AsyncOpenAI, APIError, RateLimitError
 from sklearn.metrics import classification_report
 from tabulate import tabulate
-from tqdm.asyncio import tqdm_asyncio
+from tqdm import tqdm
+
+import _cache  # sibling module: single-store response cache
+import _corpus  # sibling module: GeoCorpora reader + tag helpers
+import _llm  # sibling module: cached/batched extraction
+from _corpus import json_dumps, json_loads
 
 # ────────────────────────────────────────────────────────────────── #
 # crude tokenizer (regex identical to BoW baseline)                 #
@@ -52,33 +76,20 @@ def tokenize(text: str) -> List[str]:
 # ────────────────────────────────────────────────────────────────── #
 # GeoCorpora loader (accepts JSON array *or* JSONL)                 #
 # ────────────────────────────────────────────────────────────────── #
-def load_geocorpora(path: str | Path) -> tuple[list[str], list[list[int]]]:
-    """Return tweet texts and gold BIO tags (0 = O, 1 = LOC)."""
-    raw = re.sub(r":\s*NaN", ": null", Path(path).read_text("utf-8"))
-    records = (
-        json.loads(raw)
-        if raw.lstrip().startswith("[")
-        else [json.loads(l) for l in raw.splitlines() if l.strip()]
-    )
-
-    texts, tags = [], []
-    for obj in records:
+@_corpus.parquet_cached(("texts", "tags", "toks"), TOKEN_RE)
+def load_geocorpora(
+    path: str | Path,
+) -> tuple[list[str], list[list[int]], list[list[str]]]:
+    """Return tweet texts, gold BIO tags (0 = O, 1 = LOC) and their tokens."""
+    texts, tags, all_toks = [], [], []
+    for obj in _corpus.iter_records(path):  # streamed, one record at a time
         tweet = obj.get("text") or obj.get("tweet_text") or ""
         if not tweet:
             continue
-        toks = tokenize(tweet)
-
-        # char-offset → token index
-        offset, pos = {}, 0
-        for i, tok in enumerate(toks):
-            start = tweet.find(tok, pos)
-            if start == -1:
-                start = pos
-            for c in range(start, start + len(tok)):
-                offset[c] = i
-            pos = start + len(tok)
-
-        lab = [0] * len(toks)
+        # tokens + char-offset → token index from the match spans
+        toks, offset = _corpus.token_offsets(tweet, TOKEN_RE)
+
+        lab = np.zeros(len(toks), dtype=np.int8)
         for ent in obj.get("entities", []):
             if (ent.get("entity_type", "LOC").upper() not in {"LOCATION", "LOC", "GPE"}):
                 continue
@@ -89,20 +100,25 @@ def load_geocorpora(path: str | Path) -> tuple[list[str], list[list[int]]]:
                 e = s + len(ent["text"])
             else:
                 continue
-            for c in range(s, e):
-                if c in offset:
-                    lab[offset[c]] = 1
+            _corpus.mark_span(lab, offset, s, e)
 
         texts.append(tweet)
-        tags.append(lab)
-    return texts, tags
+        tags.append(lab.tolist())
+        all_toks.append(toks)
+    return texts, tags, all_toks
 
 
 # ────────────────────────────────────────────────────────────────── #
 # OpenAI wrapper + SHA-1 cache                                      #
 # ────────────────────────────────────────────────────────────────── #
-CACHE_DIR = Path("cache_llm")
-CACHE_DIR.mkdir(exist_ok=True)
+API_BASE = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+API_URL = f"{API_BASE}/chat/completions"
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_MAX_REQUESTS = 50_000  # Batch API limit per input file
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+FATAL_STATUS = {401, 403, 404}  # bad key / no access / unknown model: stop
+MAX_BAD_REPLIES = 5  # 200s without a parsable completion before giving up
 
 SYSTEM_MSG = (
     "You are a helpful assistant that extracts every location name "
@@ -121,19 +137,70 @@ FEW_SHOT_2 = {
     "locs": ["NYC", "LAX", "New York City"],
 }
 
-async def extract_locs(
-    client: AsyncOpenAI,
-    text: str,
-    shots: int,
-    model: str,
-    sema: asyncio.Semaphore,
-) -> list[str]:
-    """Single-tweet extraction with on-disk cache and retry logic."""
-    cache_key = sha1(f"{model}|{shots}|{text}".encode()).hexdigest()[:16]
-    cache_file = CACHE_DIR / f"{cache_key}.json"
-    if cache_file.exists():
-        return json.loads(cache_file.read_text())
+BATCH_MSG = (
+    "You are a helpful assistant that extracts every location name "
+    "(toponym) from several numbered texts. Return ONLY a JSON object "
+    "mapping each text's number (as a string) to a JSON array of its "
+    "location names, exactly as they appear in that text, including "
+    'abbreviations or repeated mentions, e.g. {"1": ["Kharkiv"], "2": []}.'
+)
+
+
+def make_session(concurrency: int) -> aiohttp.ClientSession:
+    """aiohttp session with a keep-alive pool sized for *concurrency*."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency * 2, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=60),
+        headers={"Authorization": f"Bearer {os.environ['OPENAI_API_KEY']}"},
+    )
 
+
+class TokenBucket:
+    """Async token bucket refilled at *per_minute* tokens/min (burst = 1 min)."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = self.level = float(per_minute)
+        self.stamp = time.monotonic()
+        self.lock = asyncio.Lock()  # waiters are served in arrival order
+
+    async def acquire(self, n: float = 1) -> None:
+        n = min(n, self.capacity)  # an oversized request just drains the bucket
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.level = min(
+                    self.capacity, self.level + (now - self.stamp) * self.rate
+                )
+                self.stamp = now
+                if self.level >= n:
+                    self.level -= n
+                    return
+                await asyncio.sleep((n - self.level) / self.rate)
+
+
+def est_tokens(text: str) -> int:
+    """Rough TPM cost of one request (prompt + answer) for the token bucket."""
+    return len(tokenize(text)) * 4 + 200
+
+
+def retry_after(resp: aiohttp.ClientResponse) -> float | None:
+    """Delay (s) the server asked for in the 429's Retry-After header."""
+    try:
+        return float(resp.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def cache_key(text: str, shots: int, model: str, batch: bool = False) -> str:
+    """Key of *text*'s answer; *batch* for the answer to a batched prompt."""
+    variant = f"{shots}:batch" if batch else shots  # a bare count never clashes
+    key = f"{model}|{variant}|{text}".encode()
+    return sha1(key, usedforsecurity=False).hexdigest()[:16]
+
+
+def build_messages(text: str, shots: int) -> list[dict]:
     messages = [{"role": "system", "content": SYSTEM_MSG}]
     if shots:
         messages += [
@@ -141,52 +208,236 @@ async def extract_locs(
             {"role": "assistant", "content": json.dumps(FEW_SHOT_EXAMPLE["locs"])},
         ]
     messages.append({"role": "user", "content": text})
+    return messages
+
+
+def build_batch_messages(texts: list[str], shots: int) -> list[dict]:
+    messages = [{"role": "system", "content": BATCH_MSG}]
+    if shots:
+        messages += [
+            {"role": "user", "content": _llm.numbered([FEW_SHOT_EXAMPLE["text"]])},
+            {"role": "assistant", "content": json.dumps({"1": FEW_SHOT_EXAMPLE["locs"]})},
+        ]
+    messages.append({"role": "user", "content": _llm.numbered(texts)})
+    return messages
+
 
-    backoff = 1.0
+async def chat(
+    session: aiohttp.ClientSession,
+    body: dict,
+    cost: int,
+    sema: asyncio.Semaphore,
+    rpm: TokenBucket | None = None,
+    tpm: TokenBucket | None = None,
+) -> str | None:
+    """One chat completion with rate limiting and retries; returns the content.
+
+    None if the request is given up on (rejected with a 4xx, or too many
+    unparsable replies); the tweet is then scored as no prediction.
+    """
+    backoff, bad = 1.0, 0
     while True:  # retry until success
-        async with sema:
+        wait = None
+        if rpm:
+            await rpm.acquire()
+        if tpm:
+            await tpm.acquire(cost)
+        async with sema:  # slot held for the call only
             try:
-                resp = await client.chat.completions.create(
-                    model=model, messages=messages
-                )
-                break
-            except (RateLimitError, APIError):
-                await asyncio.sleep(backoff)
-                backoff = min(backoff * 2, 30)
+                async with session.post(API_URL, json=body) as resp:
+                    if resp.status == 200:
+                        try:
+                            data = json_loads(await resp.read())
+                            return data["choices"][0]["message"]["content"] or ""
+                        except (ValueError, LookupError, TypeError):
+                            bad += 1  # 200 without a parsable completion
+                            if bad == MAX_BAD_REPLIES:
+                                tqdm.write(f"[chat] {bad} unparsable replies: skipped")
+                                return None
+                    elif resp.status == 429:
+                        wait = retry_after(resp)
+                    elif resp.status in FATAL_STATUS:
+                        resp.raise_for_status()
+                    elif resp.status < 500:
+                        tqdm.write(f"[chat] HTTP {resp.status} {resp.reason}: skipped")
+                        return None
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError):
+                pass  # dropped connection or truncated body
+        # back off without occupying a slot; jitter de-synchronises retries
+        await asyncio.sleep(wait or backoff * random.uniform(0.5, 1.5))
+        backoff = min(backoff * 2, 30)
 
-    try:
-        locs = json.loads(resp.choices[0].message.content or "[]")
-    except Exception:
-        locs = []
 
-    cache_file.write_text(json.dumps(locs))
-    return locs
+# ────────────────────────────────────────────────────────────────── #
+# Batch API (offline: misses in one job, answers to the cache)      #
+# ────────────────────────────────────────────────────────────────── #
+async def run_batch(
+    session: aiohttp.ClientSession,
+    texts: list[str],
+    shots: int,
+    model: str,
+    poll: float,
+) -> None:
+    """Submit all uncached tweets as Batch API jobs and cache the answers."""
+    todo = {}  # cache key (custom_id, must be unique) -> text
+    for txt in texts:
+        key = cache_key(txt, shots, model)
+        if _cache.get(key) is None:
+            todo[key] = txt
+    print(f"[batch] {model} | {shots}-shot: "
+          f"{len(texts) - len(todo)} cached, {len(todo)} to request")
+    lines = [
+        json_dumps({
+            "custom_id": key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": model, "messages": build_messages(txt, shots)},
+        })
+        for key, txt in todo.items()
+    ]
+
+    for i in range(0, len(lines), BATCH_MAX_REQUESTS):
+        form = aiohttp.FormData()
+        form.add_field("purpose", "batch")
+        form.add_field(
+            "file", b"\n".join(lines[i:i + BATCH_MAX_REQUESTS]),
+            filename="geocorpora_misses.jsonl", content_type="application/jsonl",
+        )
+        async with session.post(f"{API_BASE}/files", data=form) as resp:
+            resp.raise_for_status()
+            upload = json_loads(await resp.read())
+        async with session.post(f"{API_BASE}/batches", json={
+            "input_file_id": upload["id"],
+            "endpoint": BATCH_ENDPOINT,
+            "completion_window": "24h",
+        }) as resp:
+            resp.raise_for_status()
+            batch = json_loads(await resp.read())
+        print(f"[batch] submitted {batch['id']}")
+
+        while batch["status"] not in BATCH_DONE:
+            await asyncio.sleep(poll)
+            async with session.get(f"{API_BASE}/batches/{batch['id']}") as resp:
+                resp.raise_for_status()
+                batch = json_loads(await resp.read())
+            c = batch.get("request_counts") or {}
+            print(f"[batch] {batch['id']}: {batch['status']} "
+                  f"({c.get('completed', 0) + c.get('failed', 0)}/{c.get('total', '?')})")
+
+        if not batch.get("output_file_id"):
+            continue  # nothing succeeded: everything is retried online
+        url = f"{API_BASE}/files/{batch['output_file_id']}/content"
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            output = await resp.read()
+        failed = 0
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json_loads(line)
+            except ValueError:
+                rec = {}
+            content = _llm.batch_answer(rec)
+            if content is None or "custom_id" not in rec:
+                failed += 1  # left uncached -> retried online when scoring
+                continue
+            _cache.put(rec["custom_id"], json_dumps(_llm.parse_locs(content)))
+        _cache.flush()
+        if failed:
+            print(f"[batch] {batch['id']}: {failed} requests failed "
+                  f"(retried online)")
 
 
 # ────────────────────────────────────────────────────────────────── #
 # async evaluation                                                  #
 # ────────────────────────────────────────────────────────────────── #
 async def evaluate(
+    session: aiohttp.ClientSession,
     texts: list[str],
     gold: list[list[int]],
+    all_toks: list[list[str]],
     model: str,
     shots: int,
     concurrency: int,
+    use_batch: bool = False,
+    poll: float = 30,
+    rpm: TokenBucket | None = None,
+    tpm: TokenBucket | None = None,
+    batch_size: int = 1,
 ) -> tuple[str, dict]:
-    client = AsyncOpenAI()
     sema = asyncio.Semaphore(concurrency)
 
-    coro = [
-        extract_locs(client, txt, shots, model, sema) for txt in texts
-    ]
-    loc_lists = await tqdm_asyncio.gather(*coro, desc=f"{model} | {shots}-shot")
+    def key(text: str) -> str:
+        return cache_key(text, shots, model)
+
+    def batch_key(text: str) -> str:
+        return cache_key(text, shots, model, batch=True)
+
+    async def ask(text: str) -> str | None:
+        body = {"model": model, "messages": build_messages(text, shots)}
+        return await chat(session, body, est_tokens(text), sema, rpm, tpm)
+
+    async def ask_batch(batch: list[str]) -> str | None:
+        body = {
+            "model": model,
+            "messages": build_batch_messages(batch, shots),
+            "response_format": {"type": "json_object"},
+        }
+        cost = sum(est_tokens(t) for t in batch)
+        return await chat(session, body, cost, sema, rpm, tpm)
+
+    if use_batch:
+        await run_batch(session, texts, shots, model, poll)
+
+    # predictions + gold written straight into preallocated arrays
+    # (one slice per tweet) as each result arrives; y_pred starts at O, so
+    # the many empty answers cost no per-token work at all
+    off = np.cumsum([0] + [len(g) for g in gold])
+    y_true = np.empty(off[-1], dtype=np.int8)
+    y_pred = np.zeros_like(y_true)
+
+    def score(i: int, locs: list[str]) -> None:
+        y_true[off[i]:off[i + 1]] = gold[i]
+        if locs:
+            loc_set, toks = frozenset(locs), all_toks[i]
+            y_pred[off[i]:off[i + 1]] = np.fromiter(
+                (t in loc_set for t in toks), dtype=np.int8, count=len(toks)
+            )
+
+    # bounded producer/consumer: a short queue feeds `concurrency` workers,
+    # so only O(concurrency) tweets/coroutines are alive at any time
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+    pbar = tqdm(total=len(texts), desc=f"{model} | {shots}-shot")
+
+    # identical tweets (retweets, copies) are asked once and the answer is
+    # scored at every position they occur
+    where: dict[str, list[int]] = {}
+    for i, txt in enumerate(texts):
+        where.setdefault(txt, []).append(i)
+    unique = list(where)
+    step = max(batch_size, 1)
+
+    async def produce() -> None:
+        for j in range(0, len(unique), step):
+            await queue.put(unique[j:j + step])
+        for _ in range(concurrency):
+            await queue.put(None)  # one stop marker per worker
+
+    async def work() -> None:
+        while (batch := await queue.get()) is not None:
+            if step > 1:
+                results = await _llm.batch_extract(batch, key, batch_key, ask, ask_batch)
+            else:
+                results = [await _llm.extract(batch[0], key, ask)]
+            for txt, locs in zip(batch, results):
+                for i in where[txt]:
+                    score(i, locs)
+                pbar.update(len(where[txt]))
 
-    y_true, y_pred = [], []
-    for txt, gold_tags, locs in zip(texts, gold, loc_lists):
-        toks = tokenize(txt)
-        loc_set = set(locs)
-        y_true.extend(gold_tags)
-        y_pred.extend([1 if t in loc_set else 0 for t in toks])
+    with pbar:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
 
     report = classification_report(
         y_true, y_pred, target_names=["O", "LOC"], digits=3, output_dict=True
@@ -194,6 +445,34 @@ async def evaluate(
     return f"{shots}-shot", report["LOC"]  # precision/recall/f1 for LOC only
 
 
+async def run_all(
+    texts: list[str],
+    gold: list[list[int]],
+    all_toks: list[list[str]],
+    model: str,
+    shots: list[int],
+    concurrency: int,
+    use_batch: bool = False,
+    poll: float = 30,
+    rpm: int = 0,
+    tpm: int = 0,
+    batch_size: int = 1,
+) -> dict[str, dict]:
+    """Evaluate every shot setting in turn over one shared connection pool."""
+    # the buckets outlive a shot setting: the limits are per account
+    rpm_bucket = TokenBucket(rpm) if rpm else None
+    tpm_bucket = TokenBucket(tpm) if tpm else None
+    results = {}
+    async with make_session(concurrency) as session:
+        for s in shots:
+            label, metrics = await evaluate(
+                session, texts, gold, all_toks, model, s, concurrency,
+                use_batch, poll, rpm_bucket, tpm_bucket, batch_size,
+            )
+            results[label] = metrics
+    return results
+
+
 # ────────────────────────────────────────────────────────────────── #
 # CLI                                                               #
 # ────────────────────────────────────────────────────────────────── #
@@ -205,22 +484,32 @@ def main() -> None:
     p.add_argument("--limit", type=int, default=1000, help="Max tweets to eval")
     p.add_argument("--seed", type=int, default=42, help="Random seed for subsample")
     p.add_argument("--concurrency", type=int, default=100, help="Parallel requests")
+    p.add_argument("--batch-size", type=int, default=1,
+                   help="Tweets packed into one request (1 = no batching)")
+    p.add_argument("--rpm", type=int, default=0,
+                   help="Requests/min to stay under (0 = unthrottled)")
+    p.add_argument("--tpm", type=int, default=0,
+                   help="Tokens/min to stay under (0 = unthrottled)")
+    p.add_argument("--use-batch-api", action="store_true",
+                   help="Send cache misses through the Batch API (offline)")
+    p.add_argument("--poll", type=float, default=30,
+                   help="Seconds between batch status checks")
     args = p.parse_args()
 
-    texts, tags = load_geocorpora(args.geocorpora)
+    texts, tags, toks = load_geocorpora(args.geocorpora)
     if args.limit and len(texts) > args.limit:
         rnd = random.Random(args.seed)
         idx = rnd.sample(range(len(texts)), args.limit)
         texts = [texts[i] for i in idx]
         tags = [tags[i] for i in idx]
+        toks = [toks[i] for i in idx]
 
     # run every shot setting sequentially (same tweet subset & cache)
-    results = {}
-    for s in sorted(set(args.shots)):
-        label, metrics = asyncio.run(
-            evaluate(texts, tags, args.model, s, args.concurrency)
-        )
-        results[label] = metrics
+    results = asyncio.run(
+        run_all(texts, tags, toks, args.model, sorted(set(args.shots)),
+                args.concurrency, args.use_batch_api, args.poll,
+                args.rpm, args.tpm, args.batch_size)
+    )
 
     print("\n" + tabulate(
         [(k, v["precision"], v["recall"], v["f1-score"]) for k, v in results.items()],
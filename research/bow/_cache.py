@@ -0,0 +1,114 @@
+"""
+_cache.py – single-store response cache for the 4omini* benchmarks
+==================================================================
+
+Replaces the one-file-per-tweet ``cache_llm/<key>.json`` layout with one
+key → JSON-bytes store in the working directory:
+
+* ``cache_llm.lmdb``   when the `lmdb` package is installed
+* ``cache_llm.sqlite`` (WAL mode) otherwise
+
+Reads are a B-tree lookup; writes are buffered and committed every
+``FLUSH_EVERY`` puts in a single transaction (the tail is committed at
+exit).  The first time a store is created, any legacy ``cache_llm/*.json``
+files are imported so earlier runs stay free.
+"""
+from __future__ import annotations
+
+import atexit
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+try:                      # memory-mapped B-tree when available, SQLite otherwise
+    import lmdb
+except ImportError:
+    lmdb = None
+
+LEGACY_DIR = Path("cache_llm")
+FLUSH_EVERY = 100         # puts per write transaction
+MAP_SIZE = 4 << 30        # LMDB address-space reservation (grows on disk lazily)
+
+
+class _LmdbStore:
+    def __init__(self, path: str):
+        self.env = lmdb.open(path, map_size=MAP_SIZE)
+
+    def __len__(self) -> int:
+        return self.env.stat()["entries"]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.env.begin() as txn:
+            return txn.get(key.encode())
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        with self.env.begin(write=True) as txn:
+            for key, value in items:
+                txn.put(key.encode(), value)
+
+
+class _SqliteStore:
+    def __init__(self, path: str):
+        self.con = sqlite3.connect(path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS cache"
+            " (key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID"
+        )
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self.con.execute(
+            "SELECT value FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        with self.con:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?)", items
+            )
+
+
+_store = None
+_pending: Dict[str, bytes] = {}
+
+
+def _open():
+    global _store
+    if _store is None:
+        if lmdb is not None:
+            _store = _LmdbStore("cache_llm.lmdb")
+        else:
+            _store = _SqliteStore("cache_llm.sqlite")
+        if not len(_store) and LEGACY_DIR.is_dir():
+            _store.put_many(
+                (f.stem, f.read_bytes()) for f in LEGACY_DIR.glob("*.json")
+            )
+        atexit.register(flush)
+    return _store
+
+
+def get(key: str) -> Optional[bytes]:
+    """Cached JSON bytes for *key*, or ``None`` on a miss."""
+    if key in _pending:
+        return _pending[key]
+    return _open().get(key)
+
+
+def put(key: str, value: bytes) -> None:
+    """Store *value* under *key*; committed in batches of ``FLUSH_EVERY``."""
+    _open()
+    _pending[key] = value
+    if len(_pending) >= FLUSH_EVERY:
+        flush()
+
+
+def flush() -> None:
+    """Commit all buffered puts."""
+    if _pending and _store is not None:
+        _store.put_many(list(_pending.items()))
+        _pending.clear()
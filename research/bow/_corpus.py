@@ -0,0 +1,234 @@
+"""
+_corpus.py – streaming GeoCorpora reader for the 4omini* benchmarks
+===================================================================
+
+``iter_records(path)`` yields one record dict at a time from either a JSON
+array or a JSON-Lines file, so the loaders never hold the raw text, a
+NaN-patched copy and the parsed list in memory together.
+
+* JSON-Lines: parsed line by line
+* JSON array: streamed with `ijson` (yajl C backend) when installed,
+  otherwise read once as bytes and parsed in one go
+
+The GeoCorpora dumps contain bare ``NaN`` values, which neither orjson nor
+yajl accept; they are rewritten to ``null`` on the fly as before.
+
+``TOKEN_RE`` is the shared tokeniser (RE2 when installed) and
+``json_dumps`` / ``json_loads`` the shared orjson-or-stdlib codec.
+
+``token_offsets`` / ``mark_span`` turn entity character spans into token
+tags with NumPy slices instead of a per-character dict; ``load_gc`` is the
+4omini* loader built on them (texts, gold tags and tokens, optionally a
+seeded sample).  ``windows`` builds the bigram taggers' per-token context
+strings.
+
+``parquet_cached`` memoises a whole loader on disk (``.gc_cache/*.parquet``,
+needs `pyarrow`), keyed by the corpus file's path/mtime/size, the tokenizer
+pattern and the loader's source, so repeat runs skip parsing entirely.
+"""
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Pattern, Tuple
+
+import numpy as np
+
+try:                      # C encoder/parser when available, stdlib otherwise
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+try:                      # incremental array parsing
+    import ijson
+except ImportError:
+    ijson = None
+
+try:                      # on-disk loader cache
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:  # RE2 (linear-time) when installed.  Its \w and \s are ASCII-only, so
+      # the Unicode classes are spelled out to tokenise exactly like `re`.
+    import re2
+    TOKEN_RE = re2.compile(r"[\pL\pN_]+|[^\pL\pN_\s\v\x{1c}-\x{1f}\x{85}\pZ]")
+except ImportError:
+    TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+NAN_RE = re.compile(rb":\s*NaN")
+CACHE_DIR = Path(".gc_cache")
+LOC_TYPES = frozenset({"LOCATION", "LOC", "GPE"})  # entity types scored as LOC
+# load_gc labels this many tweets or more in a process pool when there is
+# more than one CPU.  Labelling costs ~185 us/tweet; pool start-up plus
+# pickling ~30-120 ms (2-8 workers), so below ~1000 tweets the pool gains
+# little or nothing
+PARALLEL_MIN_ITEMS = 1_000
+CHUNKSIZE = 256
+
+
+class _NaNAsNull:
+    """Binary reader that rewrites ``: NaN`` to ``: null`` while streaming."""
+
+    def __init__(self, fh: BinaryIO):
+        self.fh, self.tail = fh, b""
+
+    def read(self, n: int = -1) -> bytes:
+        if n == 0:                            # ijson probes bytes vs str
+            return b""
+        buf, self.tail = self.tail, b""
+        while True:
+            chunk = self.fh.read(n)
+            if not chunk:                     # EOF: nothing left to hold back
+                break
+            buf += chunk
+            # hold back a ':' whose NaN (or whitespace before it) may be cut
+            cut = buf.rfind(b":")
+            rest = buf[cut + 1:].lstrip() if cut != -1 else b"-"
+            if len(rest) >= 3 or not b"NaN".startswith(rest):
+                break
+            if cut:                           # emit what precedes the ':'
+                buf, self.tail = buf[:cut], buf[cut:]
+                break
+        return NAN_RE.sub(b": null", buf)
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Yield GeoCorpora records (JSON array or JSON-Lines) one at a time."""
+    with open(path, "rb") as fh:
+        if not fh.peek(64).lstrip().startswith(b"["):
+            for line in fh:
+                if b"NaN" in line:            # cheap test before the regex
+                    line = NAN_RE.sub(b": null", line)
+                if line.strip():
+                    yield json_loads(line)
+        elif ijson is not None:
+            yield from ijson.items(_NaNAsNull(fh), "item", use_float=True)
+        else:
+            yield from json_loads(NAN_RE.sub(b": null", fh.read()))
+
+
+def token_offsets(text: str, token_re: Pattern) -> Tuple[List[str], np.ndarray]:
+    """Tokens of *text* and the token index of every character (-1 = none).
+
+    Both come from one ``finditer`` pass: the match spans are the offsets.
+    """
+    toks, o2t = [], np.full(len(text), -1, dtype=np.int32)
+    for i, m in enumerate(token_re.finditer(text)):
+        toks.append(m.group())
+        o2t[m.start():m.end()] = i
+    return toks, o2t
+
+
+def mark_span(tags: np.ndarray, o2t: np.ndarray, s: int, e: int) -> None:
+    """Tag (=1) every token overlapping characters [s, e)."""
+    idxs = o2t[max(s, 0):max(e, 0)]
+    tags[idxs[idxs >= 0]] = 1
+
+
+def windows(tokens: List[str], n: int, width: int) -> List[str]:
+    """Context string of each of the first *n* tokens: the token and up to
+    *width* neighbours on either side, space-joined."""
+    join = " ".join
+    head = [join(tokens[:i + width + 1]) for i in range(min(width, n))]
+    return head + [
+        join(tokens[i - width:i + width + 1]) for i in range(width, n)
+    ]
+
+
+def label(tweet: str, ents: List[dict]) -> Tuple[List[int], List[str]]:
+    """Gold BIO tags and tokens for one tweet."""
+    # tokens + char-offset → token index, straight from the match spans
+    toks, offset_map = token_offsets(tweet, TOKEN_RE)
+
+    lab = np.zeros(len(toks), dtype=np.int8)
+    for ent in ents:
+        if ent.get("entity_type", "LOC").upper() not in LOC_TYPES:
+            continue
+        if "indices" in ent:
+            s, e = ent["indices"]
+        elif (pos := ent.get("char_position")) and (name := ent.get("text")):
+            s = int(float(pos))
+            e = s + len(name)
+        else:
+            continue
+        mark_span(lab, offset_map, s, e)
+    return lab.tolist(), toks
+
+
+def load_gc(
+    path: str, limit: int = 0, seed: int = 42
+) -> Tuple[List[str], List[List[int]], List[List[str]]]:
+    """Return tweet texts, gold BIO tags (0=O, 1=LOC) and their tokens.
+
+    With *limit*, only a seeded random subset of that many tweets (the one
+    ``random.Random(seed).sample`` picks) is tokenised and labelled; from
+    ``PARALLEL_MIN_ITEMS`` tweets on that runs in a process pool.
+    """
+    recs = []
+    for obj in iter_records(path):
+        tweet = obj.get("text") or obj.get("tweet_text")
+        if tweet:
+            recs.append((tweet, obj.get("entities", [])))
+    if limit and len(recs) > limit:  # sample first, label only the survivors
+        pick = random.Random(seed).sample(range(len(recs)), limit)
+        recs = [recs[i] for i in pick]
+
+    # tokenising/labelling is per-tweet CPU work: fan out over processes
+    # when there is enough of it to pay for the pool
+    workers = min(os.cpu_count() or 1, -(-len(recs) // CHUNKSIZE))
+    if workers > 1 and len(recs) >= PARALLEL_MIN_ITEMS:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            out = list(ex.map(label, *zip(*recs), chunksize=CHUNKSIZE))
+    else:
+        out = [label(tweet, ents) for tweet, ents in recs]
+    return [t for t, _ in recs], [lab for lab, _ in out], [tk for _, tk in out]
+
+
+def parquet_cached(names: Tuple[str, ...], token_re: Pattern) -> Callable:
+    """Decorate ``loader(path) -> tuple of lists`` with a Parquet cache.
+
+    *names* label the returned lists (one column each); a ``tags`` column
+    is stored as ``list<int8>``.  Without `pyarrow` the loader just runs.
+    """
+    def deco(loader: Callable) -> Callable:
+        code = inspect.getsource(loader)
+
+        @wraps(loader)
+        def wrapper(path):
+            if pa is None:
+                return loader(path)
+            src = Path(path).resolve()
+            st = src.stat()
+            key = hashlib.sha256(
+                f"{src}|{st.st_mtime_ns}|{st.st_size}|{token_re.pattern}|"
+                f"{loader.__module__}.{loader.__qualname__}|{code}".encode()
+            ).hexdigest()[:32]
+            cache = CACHE_DIR / f"{key}.parquet"
+            if cache.exists():
+                cols = pq.read_table(cache).to_pydict()
+                return tuple(cols[n] for n in names)
+
+            out = loader(path)
+            table = pa.table({
+                n: pa.array(col, pa.list_(pa.int8())) if n == "tags" else col
+                for n, col in zip(names, out)
+            })
+            CACHE_DIR.mkdir(exist_ok=True)
+            tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, cache)  # atomic: readers never see half a file
+            return out
+        return wrapper
+    return deco
@@ -0,0 +1,197 @@
+"""
+_llm.py – chat plumbing shared by the 4omini* benchmarks
+========================================================
+
+The scripts differ in their prompts, not in how a request is sent, cached
+or batched, so that part lives here once:
+
+* ``make_client`` / ``chat`` – AsyncOpenAI on a keep-alive httpx pool
+  (HTTP/2 when `h2` is installed); 429s are retried with jittered
+  exponential back-off, honouring Retry-After
+* ``cache_key`` / ``cached`` / ``lookup`` / ``parse_locs`` – the per-tweet
+  SHA-1 key (answers to batched prompts get keys of their own), its
+  `_cache` lookup and the tolerant JSON-array parse of an answer;
+  ``batch_answer`` pulls the reply out of one Batch API output line
+* ``extract`` / ``batch_extract`` – one tweet per request, or several
+  ``numbered`` tweets per request with a per-tweet fallback.  The caller
+  passes how to ask (``ask`` / ``ask_batch`` coroutines) and how to key
+  each prompt variant in the cache, so 4ominip.py's raw aiohttp client
+  and model-specific keys use them too; the OpenAI SDK is only needed by
+  ``make_client`` / ``chat``.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+from functools import lru_cache
+from hashlib import sha1
+from typing import Awaitable, Callable, List
+
+import _cache  # sibling module: single-store response cache
+from _corpus import json_dumps, json_loads
+
+try:                      # only make_client/chat need the SDK (4ominip.py doesn't)
+    import httpx
+    from openai import AsyncOpenAI, RateLimitError
+except ImportError:
+    AsyncOpenAI = None
+
+try:                      # HTTP/2 multiplexing needs the optional `h2` package
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+MODEL = "o4-mini"
+
+
+def make_client(concurrency: int) -> AsyncOpenAI:
+    """AsyncOpenAI on a keep-alive httpx pool sized for *concurrency*."""
+    http = httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=concurrency * 2,
+            max_keepalive_connections=concurrency * 2,
+        ),
+        timeout=httpx.Timeout(60, connect=10),
+    )
+    return AsyncOpenAI(http_client=http)
+
+
+def retry_after(exc: RateLimitError) -> float | None:
+    """Delay (s) the server asked for in the 429's Retry-After header."""
+    try:
+        return float(exc.response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def chat(
+    client: AsyncOpenAI, sema: asyncio.Semaphore, messages: List[dict], **params
+) -> str:
+    """One chat completion with rate-limit retries; returns the content.
+
+    *params* (e.g. ``top_p``) are passed through to the completion call.
+    """
+    backoff = 1.0
+    while True:  # retry loop
+        async with sema:  # cap concurrency (slot held for the call only)
+            try:
+                rsp = await client.chat.completions.create(
+                    model=MODEL, messages=messages, **params
+                )
+                break
+            except RateLimitError as exc:
+                wait = retry_after(exc)
+        # back off without occupying a slot; jitter de-synchronises retries
+        await asyncio.sleep(wait or backoff * random.uniform(0.5, 1.5))
+        backoff = min(backoff * 2, 30)  # ceil at 30 s
+    return rsp.choices[0].message.content or ""
+
+
+@lru_cache(maxsize=None)  # hashed once per tweet, not per lookup/put
+def cache_key(text: str, shots: int, batch: bool = False) -> str:
+    """Key of *text*'s answer; *batch* for the answer to a batched prompt."""
+    raw = f"batch|{shots}_{text}" if batch else f"{shots}_{text}"
+    return sha1(raw.encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def cached(key: str) -> List[str] | None:
+    """Cached locations under *key*, or None if it still needs a request."""
+    value = _cache.get(key)
+    return None if value is None else json_loads(value)
+
+
+def lookup(text: str, *keys: Callable[[str], str]) -> List[str] | None:
+    """First cached answer for *text* under *keys*, tried in order."""
+    for key in keys:
+        locs = cached(key(text))
+        if locs is not None:
+            return locs
+    return None
+
+
+def parse_locs(content: str | None) -> List[str]:
+    """The JSON array in an answer; anything unparsable counts as none."""
+    try:
+        return json_loads(content or "[]")
+    except Exception:
+        return []
+
+
+def batch_answer(rec: dict) -> str | None:
+    """Reply text of one Batch API output line, or None if the request failed."""
+    rsp = rec.get("response") or {}
+    if rec.get("error") or rsp.get("status_code") != 200:
+        return None
+    try:
+        return rsp["body"]["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return None  # 200 without a usable completion
+
+
+def numbered(texts: List[str]) -> str:
+    return "\n".join(f"{n}) {t}" for n, t in enumerate(texts, 1))
+
+
+async def extract(
+    text: str,
+    key: Callable[[str], str],
+    ask: Callable[[str], Awaitable[str | None]],
+) -> List[str]:
+    """One-tweet extraction: the cached answer, else ``ask(text)``'s, cached.
+
+    ``ask`` returning None means the request failed for good: the tweet
+    counts as having no locations and is left uncached for the next run.
+    """
+    locs = cached(key(text))
+    if locs is not None:
+        return locs
+
+    content = await ask(text)
+    if content is None:
+        return []
+    locs = parse_locs(content)
+    _cache.put(key(text), json_dumps(locs))
+    return locs
+
+
+async def batch_extract(
+    texts: List[str],
+    key: Callable[[str], str],
+    batch_key: Callable[[str], str],
+    ask: Callable[[str], Awaitable[str | None]],
+    ask_batch: Callable[[List[str]], Awaitable[str | None]],
+) -> List[List[str]]:
+    """Extract several tweets with one request; cache stays per tweet.
+
+    Cached tweets (under *batch_key*, else under the single-prompt *key*)
+    are left out of the prompt; ``ask_batch`` gets the rest and should
+    answer with a JSON object mapping each text's number (see
+    ``numbered``) to its locations.  Those answers are cached under
+    *batch_key* only, so single-prompt runs never score them.  Tweets the
+    answer does not cover, e.g. because it cannot be parsed, fall back to
+    one request each.
+    """
+    out = [lookup(txt, batch_key, key) for txt in texts]
+    todo = [i for i, locs in enumerate(out) if locs is None]
+
+    if len(todo) > 1:
+        try:
+            by_num = json_loads(await ask_batch([texts[i] for i in todo]))
+        except Exception:
+            by_num = {}
+        if not isinstance(by_num, dict):
+            by_num = {}
+
+        for n, i in enumerate(todo, 1):
+            locs = by_num.get(str(n))
+            if isinstance(locs, list):
+                out[i] = locs
+                _cache.put(batch_key(texts[i]), json_dumps(locs))
+
+    # single misses and anything the batched answer did not cover
+    for i in todo:
+        if out[i] is None:
+            out[i] = await extract(texts[i], key, ask)
+    return out
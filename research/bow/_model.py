@@ -0,0 +1,68 @@
+"""
+_model.py – pickle-free artefacts for the bigram BoW taggers
+============================================================
+
+The taggers are a (Hashing|Count)Vectorizer plus a binary
+LogisticRegression, i.e. one weight vector over a sparse feature space.
+``save`` writes exactly that to one ``.npz`` file instead of two joblib
+pickles:
+
+* ``coef`` / ``intercept`` / ``classes`` as plain float32/int arrays
+* the vectorizer's constructor parameters (and, for a CountVectorizer,
+  its vocabulary in column order) as one JSON string
+
+``load`` rebuilds the same two scikit-learn objects from that file with
+``allow_pickle=False``, so nothing is unpickled, loading is an array read
+instead of object reconstruction, and the file survives scikit-learn
+upgrades.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+VECTORIZERS = {cls.__name__: cls for cls in (CountVectorizer, HashingVectorizer)}
+
+
+def save(path: str | Path, vec, clf: LogisticRegression) -> None:
+    """Write *vec* and *clf* to a single ``.npz`` at *path*."""
+    params = vec.get_params()
+    params["dtype"] = np.dtype(params["dtype"]).name
+    meta = {"vectorizer": type(vec).__name__, "params": params}
+    if hasattr(vec, "vocabulary_"):  # fitted CountVectorizer
+        meta["vocabulary"] = vec.get_feature_names_out().tolist()
+    np.savez_compressed(
+        path,
+        coef=clf.coef_.astype(np.float32),
+        intercept=clf.intercept_.astype(np.float32),
+        classes=clf.classes_,
+        meta=np.array(json.dumps(meta)),
+    )
+
+
+def load(path: str | Path) -> Tuple[object, LogisticRegression]:
+    """Rebuild ``(vectorizer, classifier)`` from a file written by ``save``."""
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(npz["meta"].item())
+        coef, intercept, classes = npz["coef"], npz["intercept"], npz["classes"]
+
+    params = meta["params"]
+    params["dtype"] = np.dtype(params["dtype"]).type
+    params["ngram_range"] = tuple(params["ngram_range"])
+    if "vocabulary" in meta:
+        params["vocabulary"] = meta["vocabulary"]  # list: term i -> column i
+    vec = VECTORIZERS[meta["vectorizer"]](**params)
+    if "vocabulary" in meta:
+        vec.fit([])  # materialise vocabulary_ from the fixed vocabulary
+
+    clf = LogisticRegression()
+    clf.coef_ = coef.astype(np.float64)
+    clf.intercept_ = intercept.astype(np.float64)
+    clf.classes_ = classes
+    clf.n_features_in_ = coef.shape[1]
+    return vec, clf
@@ -4,27 +4,30 @@
 from __future__ import annotations
 
 import argparse
-import json
 import random
 import re
 import sys
+from itertools import chain
 from pathlib import Path
 from typing import List, Tuple
 
-import joblib
 import numpy as np
 import pandas as pd
 from scipy import sparse
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
 from tabulate import tabulate
 from tqdm.auto import tqdm
 
+import _corpus  # sibling module: GeoCorpora reader + tag helpers
+import _model  # sibling module: pickle-free model artefacts
+
 # ────────────────────────────────────────────────────────────────── #
 # hyper-parameters                                                  #
 # ────────────────────────────────────────────────────────────────── #
 NGRAM_RANGE = (1, 2)
+N_FEATURES = 2**18   # hashed feature space (no vocabulary to build)
 WINDOW = 2          # tokens on each side (total 2*WINDOW+1 context)
 THRESH = 0.5        # probability cutoff for LOC vs O
 ART_DIR = Path("artifacts")
@@ -38,31 +41,16 @@ def tokenize(text: str) -> List[str]:
 # ────────────────────────────────────────────────────────────────── #
 # GeoCorpora loader (same as in LLM script, but yields token lists) #
 # ────────────────────────────────────────────────────────────────── #
+@_corpus.parquet_cached(("tokens", "tags"), TOKEN_RE)
 def load_geocorpora(path: str | Path) -> Tuple[list[list[str]], list[list[int]]]:
-    raw = re.sub(r":\s*NaN", ": null", Path(path).read_text("utf-8"))
-    records = (
-        json.loads(raw)
-        if raw.lstrip().startswith("[")
-        else [json.loads(l) for l in raw.splitlines() if l.strip()]
-    )
-
     tokens, tags = [], []
-    for obj in records:
+    for obj in _corpus.iter_records(path):  # streamed, one record at a time
         tweet = obj.get("text") or obj.get("tweet_text") or ""
         if not tweet:
             continue
-        toks = tokenize(tweet)
-
-        offset, pos = {}, 0
-        for i, tok in enumerate(toks):
-            start = tweet.find(tok, pos)
-            if start == -1:
-                start = pos
-            for c in range(start, start + len(tok)):
-                offset[c] = i
-            pos = start + len(tok)
-
-        lab = [0] * len(toks)
+        toks, offset = _corpus.token_offsets(tweet, TOKEN_RE)
+
+        lab = np.zeros(len(toks), dtype=np.int8)
         for ent in obj.get("entities", []):
             if (ent.get("entity_type", "LOC").upper() not in {"LOCATION", "LOC", "GPE"}):
                 continue
@@ -73,42 +61,55 @@ def load_geocorpora(path: str | Path) -> Tuple[list[list[str]], list[list[int]]]
                 e = s + len(ent["text"])
             else:
                 continue
-            for c in range(s, e):
-                if c in offset:
-                    lab[offset[c]] = 1
+            _corpus.mark_span(lab, offset, s, e)
 
         tokens.append(toks)
-        tags.append(lab)
+        tags.append(lab.tolist())
     return tokens, tags
 
 
 # ────────────────────────────────────────────────────────────────── #
 # helpers                                                           #
 # ────────────────────────────────────────────────────────────────── #
-def context(tokens: List[str], i: int) -> str:
-    left = max(0, i - WINDOW)
-    right = i + WINDOW + 1
-    return " ".join(tokens[left:right])
-
-
 def flatten(
     token_seqs: list[list[str]],
     tag_seqs: list[list[int]],
     add_caps: bool,
-) -> Tuple[list[str], list[int], list[List[bool]]]:
-    docs, y, caps = [], [], []
+) -> Tuple[list[str], np.ndarray, np.ndarray | None]:
+    """Context strings plus int8 labels / bool cap flags (None if unused)."""
+    total = sum(map(len, tag_seqs))
+    docs = []
+    y = np.empty(total, dtype=np.int8)
+    k = 0
     for toks, tags in zip(token_seqs, tag_seqs):
-        for i, tag in enumerate(tags):
-            docs.append(context(toks, i))
-            y.append(tag)
-            caps.append([toks[i].istitle()] if add_caps else [])
+        n = len(tags)
+        docs += _corpus.windows(toks, n, WINDOW)
+        y[k:k + n] = tags
+        k += n
+    # one tag per token, so the flags are a single pass over all tokens
+    caps = np.fromiter(
+        (t.istitle() for t in chain.from_iterable(token_seqs)),
+        dtype=np.bool_,
+        count=total,
+    ) if add_caps else None
     return docs, y, caps
 
 
-def add_cap_feature(X: sparse.spmatrix, caps: list[List[bool]]) -> sparse.spmatrix:
-    if not caps or not caps[0]:
+def add_cap_feature(X: sparse.spmatrix, caps: np.ndarray | None) -> sparse.spmatrix:
+    if caps is None:
         return X
-    return sparse.hstack([X, np.array(caps, dtype=float)], format="csr")
+    # the flag column built straight as CSR (one stored 1 per capitalised
+    # row), so hstack stays CSR-native instead of going dense -> COO -> CSR
+    nnz = int(caps.sum())
+    col = sparse.csr_matrix(
+        (
+            np.ones(nnz, dtype=X.dtype),
+            np.zeros(nnz, dtype=np.int32),
+            np.concatenate(([0], np.cumsum(caps))),
+        ),
+        shape=(len(caps), 1),
+    )
+    return sparse.hstack([X, col], format="csr")
 
 
 # ────────────────────────────────────────────────────────────────── #
@@ -131,12 +132,15 @@ def run(
         [tags[i] for i in tr_idx],
         add_caps,
     )
-    vec = CountVectorizer(
+    vec = HashingVectorizer(
+        n_features=N_FEATURES,
+        alternate_sign=False,
         lowercase=False,
         ngram_range=NGRAM_RANGE,
-        min_df=1,
+        norm=None,
+        dtype=np.float32,
     )
-    Xtr = vec.fit_transform(Xtr_raw)
+    Xtr = vec.transform(Xtr_raw)
     Xtr = add_cap_feature(Xtr, caps_tr)
 
     clf = LogisticRegression(
@@ -165,8 +169,7 @@ def run(
     )
 
     ART_DIR.mkdir(exist_ok=True)
-    joblib.dump(vec, ART_DIR / "vectorizer_bow.joblib")
-    joblib.dump(clf, ART_DIR / "logreg_bow.joblib")
+    _model.save(ART_DIR / "logreg_bow.npz", vec, clf)
 
 
 # ────────────────────────────────────────────────────────────────── #
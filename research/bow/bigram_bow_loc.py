@@ -10,7 +10,8 @@ from datasets import load_dataset  # 🤗 Datasets – pip install datasets
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report as sk_report
-import joblib  # for model persistence
+
+import _model  # sibling module: pickle-free model artefacts
 
 WINDOW = 2  # tokens on each side  → 5‑gram window
 
@@ -59,18 +60,15 @@ def train():
     print(sk_report(y_dev, preds, target_names=["O", "LOC"], digits=3))
 
     Path("artifacts").mkdir(exist_ok=True)
-    joblib.dump(vec, "artifacts/vectorizer.joblib")
-    joblib.dump(clf, "artifacts/logreg_loc.joblib")
+    _model.save("artifacts/logreg_loc.npz", vec, clf)
 
 
 # ---------------------------------------------------------------------
 # 3. Inference convenience
 # ---------------------------------------------------------------------
 
-def load_model(vec_path="artifacts/vectorizer.joblib", clf_path="artifacts/logreg_loc.joblib"):
-    vec = joblib.load(vec_path)
-    clf = joblib.load(clf_path)
-    return vec, clf
+def load_model(path="artifacts/logreg_loc.npz"):
+    return _model.load(path)
 
 
 def tag_tokens(tokens: List[str], vec, clf, span: int = WINDOW) -> List[str]:
@@ -7,14 +7,12 @@ from __future__ import annotations
 
 import argparse
 import csv
-import json
 import random
 import re
 import sys
 from pathlib import Path
-from typing import Iterable, List
+from typing import List
 
-import joblib
 import numpy as np
 import pandas as pd
 from packaging.version import parse as V
@@ -37,17 +35,21 @@ except ImportError as e:  # pragma: no cover
     sys.exit(f"Please `pip install datasets pandas numpy scikit-learn` → {e}")
 
 from scipy import sparse
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
 from tqdm.auto import tqdm
 
+import _corpus  # sibling module: GeoCorpora reader + tag helpers
+import _model  # sibling module: pickle-free model artefacts
+
 # ------------------------------------------------------------------#
 # global hyper-params                                               #
 # ------------------------------------------------------------------#
 WINDOW = 2               # tokens each side → 5-gram context
 THRESH = 0.5            # probability cutoff for LOC vs O
 RAND_SEED = 42
+N_FEATURES = 2**18       # hashed unigram+bigram space (no vocabulary)
 ART_DIR = Path("artifacts")
 
 # ------------------------------------------------------------------#
@@ -60,19 +62,6 @@ def tokenize(text: str) -> List[str]:
     return TOKEN_RE.findall(text)
 
 
-def offset2tok(text: str, tokens: List[str]) -> dict[int, int]:
-    """Map every character offset in *text* to its token index."""
-    mapping, pos = {}, 0
-    for idx, tok in enumerate(tokens):
-        start = text.find(tok, pos)
-        if start == -1:
-            start = pos
-        for c in range(start, start + len(tok)):
-            mapping[c] = idx
-        pos = start + len(tok)
-    return mapping
-
-
 # ------------------------------------------------------------------#
 # GeoCorpora readers                                                #
 # ------------------------------------------------------------------#
@@ -87,25 +76,28 @@ def read_gc_tsv(path: Path) -> List[dict]:
         on_bad_lines="skip",
     ).dropna(subset=["tweet_text", "text"])
 
+    # column arrays once, up front; the loop below only slices them
+    tweets = df["tweet_text"].astype(str).to_numpy()
+    locs = df["text"].astype(str).to_numpy()
+    pos = pd.to_numeric(df["char_position"], errors="coerce").to_numpy(float)
+    has_pos = np.isfinite(pos)            # else: fall back to a text search
+    starts = np.where(has_pos, pos, 0).astype(np.int64)  # truncates like int()
+    ids = df["tweet_id_str"].astype("category")
+
     examples: List[dict] = []
-    for _, grp in df.groupby("tweet_id_str"):
-        tweet = str(grp["tweet_text"].iloc[0])
-        toks = tokenize(tweet)
-        o2t = offset2tok(tweet, toks)
+    for rows in ids.groupby(ids, observed=True).indices.values():
+        tweet = tweets[rows[0]]
+        toks, o2t = _corpus.token_offsets(tweet, TOKEN_RE)
         tags = np.zeros(len(toks), dtype=int)
 
-        for _, row in grp.iterrows():
-            loc = str(row["text"])
-            try:
-                start = int(float(row["char_position"]))
-            except Exception:
+        for r in rows:
+            loc, start = locs[r], starts[r]
+            if not has_pos[r]:
                 m = re.search(re.escape(loc), tweet, flags=re.I)
                 if not m:
                     continue
                 start = m.start()
-            for c in range(start, start + len(loc)):
-                if c in o2t:
-                    tags[o2t[c]] = 1
+            _corpus.mark_span(tags, o2t, start, start + len(loc))
 
         examples.append({"tokens": toks, "ner_tags": tags.tolist()})
     return examples
@@ -113,20 +105,12 @@ def read_gc_tsv(path: Path) -> List[dict]:
 
 def read_gc_json(path: Path) -> List[dict]:
     """Parse Kaggle-style JSON array *or* JSONL GeoCorpora dump."""
-    txt = re.sub(r":\s*NaN", ": null", path.read_text("utf-8"))
-    records: Iterable[dict]
-    if txt.lstrip().startswith("["):
-        records = json.loads(txt)
-    else:
-        records = (json.loads(l) for l in txt.splitlines() if l.strip())
-
     out: List[dict] = []
-    for obj in records:
+    for obj in _corpus.iter_records(path):  # streamed, one record at a time
         tweet = obj.get("text") or obj.get("tweet_text") or ""
         if not tweet:
             continue
-        toks = tokenize(tweet)
-        o2t = offset2tok(tweet, toks)
+        toks, o2t = _corpus.token_offsets(tweet, TOKEN_RE)
         tags = np.zeros(len(toks), dtype=int)
 
         for ent in obj.get("entities", []):
@@ -145,9 +129,7 @@ def read_gc_json(path: Path) -> List[dict]:
             else:
                 continue
 
-            for c in range(s, e):
-                if c in o2t:
-                    tags[o2t[c]] = 1
+            _corpus.mark_span(tags, o2t, s, e)
 
         out.append({"tokens": toks, "ner_tags": tags.tolist()})
     return out
@@ -190,18 +172,12 @@ def load_geocorpora(path_like: str | Path, split: float = 0.8) -> DatasetDict:
 # ------------------------------------------------------------------#
 # Bag-of-Words helpers                                              #
 # ------------------------------------------------------------------#
-def context(tokens: List[str], i: int) -> str:
-    left = max(0, i - WINDOW)
-    right = i + WINDOW + 1
-    return " ".join(tokens[left:right])
-
-
 def flatten(split, loc_ids):
     docs, y = [], []
     for ex in split:
-        for i, tag in enumerate(ex["ner_tags"]):
-            docs.append(context(ex["tokens"], i))
-            y.append(1 if tag in loc_ids else 0)
+        tags = ex["ner_tags"]
+        docs += _corpus.windows(ex["tokens"], len(tags), WINDOW)
+        y += [1 if tag in loc_ids else 0 for tag in tags]
     return docs, y
 
 
@@ -217,8 +193,15 @@ def run(ds: DatasetDict, label: str):
     loc_ids = [1]  # LOC index in our two-class label list
     Xtr_raw, ytr = flatten(ds["train"], loc_ids)
 
-    vec = CountVectorizer(min_df=1, ngram_range=(1, 2), lowercase=False)
-    Xtr = add_caps(vec.fit_transform(Xtr_raw), Xtr_raw)
+    vec = HashingVectorizer(
+        n_features=N_FEATURES,
+        alternate_sign=False,
+        ngram_range=(1, 2),
+        lowercase=False,
+        norm=None,
+        dtype=np.float32,
+    )
+    Xtr = add_caps(vec.transform(Xtr_raw), Xtr_raw)
 
     clf = LogisticRegression(max_iter=1000, class_weight="balanced", n_jobs=-1)
     clf.fit(Xtr, ytr)
@@ -230,8 +213,7 @@ def run(ds: DatasetDict, label: str):
     print(f"\n[ EVAL ] {label}\n" + classification_report(yte, preds, target_names=["O", "LOC"], digits=3))
 
     ART_DIR.mkdir(exist_ok=True)
-    joblib.dump(vec, ART_DIR / f"vectorizer_{label}.joblib")
-    joblib.dump(clf, ART_DIR / f"logreg_{label}.joblib")
+    _model.save(ART_DIR / f"logreg_{label}.npz", vec, clf)
 
 
 # ------------------------------------------------------------------#